@@ -0,0 +1,134 @@
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from section_1.benchmarks.generators import daily_prices, tickers, CURRENCIES
+
+
+class FakeApiServer:
+    """
+    Local stand-in for the Polygon aggregates, Polygon grouped daily and Frankfurter timeseries endpoints.
+    Polygon responses are paginated through next_url with the requested limit, and every
+    rate_limit_every-th request is answered with a 429 and Retry-After: 0.
+    Pages are capped at max_page_size rows so pagination is exercised.
+    Grouped daily responses hold market_size synthetic tickers per weekday.
+    """
+
+    def __init__(self, rate_limit_every: int = 0, max_page_size: int = 1000, currencies=CURRENCIES,
+                 market_size: int = 100):
+        self.rate_limit_every = rate_limit_every
+        self.max_page_size = max_page_size
+        self.currencies = currencies
+        self.market_size = market_size
+        self.request_count = 0
+        self.rate_limited_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _should_rate_limit(self) -> bool:
+        with self._lock:
+            self.request_count += 1
+            limited = self.rate_limit_every and self.request_count % self.rate_limit_every == 0
+            if limited:
+                self.rate_limited_count += 1
+            return bool(limited)
+
+    def polygon_aggregates(self, path: str, query: dict) -> dict:
+        # Path: /v2/aggs/ticker/{ticker}/range/1/day/{from}/{to}
+        parts = path.strip("/").split("/")
+        ticker, date_from, date_to = parts[3], parts[7], parts[8]
+        limit = min(int(query.get("limit", ["5000"])[0]), self.max_page_size)
+        offset = int(query.get("offset", ["0"])[0])
+        days = daily_prices(ticker, datetime.fromisoformat(date_from), datetime.fromisoformat(date_to))
+        page = days[offset:offset + limit]
+        results = [{"t": int(row["date"].replace(tzinfo=timezone.utc).timestamp() * 1000),
+                    "o": row["open"], "h": row["high"], "l": row["low"], "c": row["close"], "v": row["volume"]}
+                   for row in page]
+        data = {"ticker": ticker.upper(), "status": "OK", "resultsCount": len(results)}
+        if results:
+            data["results"] = results
+        if offset + limit < len(days):
+            next_query = urlencode({"limit": limit, "offset": offset + limit})
+            data["next_url"] = f"{self.base_url}{path}?{next_query}"
+        return data
+
+    def polygon_grouped(self, path: str, query: dict) -> dict:
+        # Path: /v2/aggs/grouped/locale/us/market/stocks/{date}
+        day = datetime.fromisoformat(path.rstrip("/").split("/")[-1])
+        results = []
+        for ticker in tickers(self.market_size):
+            for row in daily_prices(ticker, day, day):
+                results.append({"T": ticker, "t": int(row["date"].replace(tzinfo=timezone.utc).timestamp() * 1000),
+                                "o": row["open"], "h": row["high"], "l": row["low"], "c": row["close"],
+                                "v": row["volume"]})
+        data = {"status": "OK", "resultsCount": len(results)}
+        if results:
+            data["results"] = results
+        return data
+
+    def frankfurter_timeseries(self, path: str, query: dict) -> dict:
+        # Path: /v1/{from}..{to}
+        date_range = path.rstrip("/").split("/")[-1]
+        date_from, _, date_to = date_range.partition("..")
+        start = datetime.fromisoformat(date_from)
+        end = datetime.fromisoformat(date_to) if date_to else datetime.now()
+        base = query.get("base", ["EUR"])[0]
+        rates = {}
+        day = start
+        while day <= end:
+            if day.weekday() < 5:
+                rates[day.strftime("%Y-%m-%d")] = {
+                    currency: round(1 + (index + 1) * 0.1 + day.toordinal() % 7 * 0.001, 5)
+                    for index, currency in enumerate(self.currencies) if currency != base
+                }
+            day += timedelta(days=1)
+        return {"base": base, "start_date": date_from, "end_date": end.strftime("%Y-%m-%d"), "rates": rates}
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if fake._should_rate_limit():
+                    self.send_response(429)
+                    self.send_header("Retry-After", "0")
+                    self.end_headers()
+                    return
+                parts = urlsplit(self.path)
+                query = parse_qs(parts.query)
+                if parts.path.startswith("/v2/aggs/ticker/"):
+                    data = fake.polygon_aggregates(parts.path, query)
+                elif parts.path.startswith("/v2/aggs/grouped/"):
+                    data = fake.polygon_grouped(parts.path, query)
+                elif parts.path.startswith("/v1/"):
+                    data = fake.frankfurter_timeseries(parts.path, query)
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = json.dumps(data).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
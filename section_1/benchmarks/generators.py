@@ -0,0 +1,78 @@
+import random
+from datetime import datetime, timedelta
+from typing import Iterator, List
+
+import numpy as np
+import pandas as pd
+
+CURRENCIES = ["USD", "EUR", "ILS", "GBP", "JPY", "CHF", "CAD", "AUD"]
+
+
+def tickers(count: int) -> List[str]:
+    return [f"T{index:05d}" for index in range(count)]
+
+
+def business_days(date_from: datetime, date_to: datetime) -> pd.DatetimeIndex:
+    return pd.bdate_range(date_from, date_to)
+
+
+def daily_prices(ticker: str, date_from: datetime, date_to: datetime) -> List[dict]:
+    # Deterministic random-walk daily bars for one ticker, as plain rows.
+    rng = random.Random(ticker)
+    price = rng.uniform(10, 500)
+    rows = []
+    for day in business_days(date_from, date_to):
+        price = max(1.0, price * (1 + rng.gauss(0, 0.02)))
+        rows.append({"date": day.to_pydatetime(), "open": round(price * 0.99, 4), "high": round(price * 1.02, 4),
+                     "low": round(price * 0.97, 4), "close": round(price, 4),
+                     "volume": rng.randint(1_000, 10_000_000)})
+    return rows
+
+
+def stock_frames(ticker_count: int, date_from: datetime, date_to: datetime, source_id: int = 1,
+                 chunk_rows: int = 100_000) -> Iterator[pd.DataFrame]:
+    # Vectorized synthetic stock_records frames, yielded in chunks so millions of rows stay bounded.
+    days = business_days(date_from, date_to)
+    rng = np.random.default_rng(source_id)
+    tickers_per_chunk = max(1, chunk_rows // max(1, len(days)))
+    names = tickers(ticker_count)
+    for start in range(0, ticker_count, tickers_per_chunk):
+        chunk = names[start:start + tickers_per_chunk]
+        close = rng.uniform(10, 500, (len(chunk), 1)) * np.cumprod(
+            1 + rng.normal(0, 0.02, (len(chunk), len(days))), axis=1)
+        close = close.ravel()
+        yield pd.DataFrame({
+            "source_id": source_id,
+            "date": np.tile(days.values, len(chunk)),
+            "open": close * 0.99,
+            "high": close * 1.02,
+            "low": close * 0.97,
+            "close": close,
+            "volume": rng.integers(1_000, 10_000_000, len(close)),
+            "stock_ticker": np.repeat(chunk, len(days)),
+            "base_currency": "USD",
+        })
+
+
+def exchange_rate_frame(date_from: datetime, date_to: datetime, base_currency: str = "USD",
+                        currencies: List[str] = CURRENCIES, source_id: int = 2) -> pd.DataFrame:
+    days = business_days(date_from, date_to)
+    targets = [currency for currency in currencies if currency != base_currency]
+    rng = np.random.default_rng(len(days))
+    rates = rng.uniform(0.5, 5, (1, len(targets))) * np.cumprod(
+        1 + rng.normal(0, 0.005, (len(days), len(targets))), axis=0)
+    return pd.DataFrame({
+        "source_id": source_id,
+        "date": np.repeat(days.values, len(targets)),
+        "base_currency": base_currency,
+        "target_currency": np.tile(targets, len(days)),
+        "rate": rates.ravel(),
+    })
+
+
+def random_lookups(ticker_names: List[str], date_from: datetime, date_to: datetime, count: int,
+                   currencies: List[str] = CURRENCIES, seed: int = 0) -> List[tuple]:
+    rng = random.Random(seed)
+    span = (date_to - date_from).days
+    return [(rng.choice(ticker_names), date_from + timedelta(days=rng.randint(0, span)), rng.choice(currencies))
+            for _ in range(count)]
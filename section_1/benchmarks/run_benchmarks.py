@@ -0,0 +1,273 @@
+"""
+Throughput and latency benchmarks for the section_1 pipeline.
+
+Runs every scenario against a temporary SQLite database and, when --postgres-url is given,
+against that PostgreSQL database too. The PostgreSQL database must be dedicated to
+benchmarking: its tables are dropped and recreated. Correctness checks run first and abort
+the run on a mismatch. Results are written as JSON.
+
+    python -m section_1.benchmarks.run_benchmarks --tickers 500 --years 5 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, List
+
+import numpy as np
+import pandas as pd
+
+# Note: The fake servers enforce their own 429s; the client-side limiters must not throttle the benchmark.
+os.environ.setdefault("RATE_LIMIT_POLYGON_PER_MINUTE", "1000000")
+os.environ.setdefault("RATE_LIMIT_FRANKFURTER_PER_MINUTE", "1000000")
+
+from section_1.benchmarks.fake_servers import FakeApiServer  # noqa: E402
+from section_1.benchmarks.generators import (  # noqa: E402
+    exchange_rate_frame, random_lookups, stock_frames, tickers
+)
+from section_1.collectors.data_classes import ExchangeRateRecord, StockRecord  # noqa: E402
+from section_1.collectors.exchange_rate_collector import FrankfurterExchangeRateCollector  # noqa: E402
+from section_1.collectors.polygon_collector import PolygonCollector  # noqa: E402
+from section_1.database import Base, DbData, DbSettings, get_engine, init_db  # noqa: E402
+from section_1.main import replay_options  # noqa: E402
+from section_1.models import SourceConfig  # noqa: E402
+
+
+def _latency_summary(samples: List[float]) -> dict:
+    milliseconds = np.array(samples) * 1000
+    return {"count": len(samples), "p50_ms": float(np.percentile(milliseconds, 50)),
+            "p99_ms": float(np.percentile(milliseconds, 99)), "mean_ms": float(milliseconds.mean())}
+
+
+def _measure_latency(calls: List[Callable]) -> dict:
+    samples = []
+    for call in calls:
+        started = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - started)
+    return _latency_summary(samples)
+
+
+def _throughput(records: int, seconds: float) -> dict:
+    return {"records": records, "seconds": seconds, "records_per_sec": records / seconds if seconds else None}
+
+
+def _reset_database(db_url: str) -> None:
+    os.environ["DB_URL"] = db_url
+    Base.metadata.drop_all(get_engine(db_url))
+    init_db(db_url)
+
+
+def bench_ingestion(args, date_from: datetime, date_to: datetime) -> List[dict]:
+    db_data = DbData()
+    results = []
+
+    records, started = 0, time.perf_counter()
+    for frame in stock_frames(args.tickers, date_from, date_to):
+        records += db_data.write_frame(frame, "stock_records")["inserted"]
+    results.append({"scenario": "ingest_stock_write_frame", **_throughput(records, time.perf_counter() - started)})
+
+    records, started = 0, time.perf_counter()
+    for frame in stock_frames(args.tickers, date_from, date_to):
+        stats = db_data.write_frame(frame, "stock_records")
+        records += stats["inserted"] + stats["modified"] + stats["unchanged"]
+    results.append({"scenario": "upsert_stock_write_frame_overlap",
+                    **_throughput(records, time.perf_counter() - started)})
+
+    frame = next(stock_frames(max(1, args.tickers // 10), date_from, date_to, source_id=3))
+    batch = [StockRecord(id="", **row) for row in frame.to_dict(orient="records")]
+    started = time.perf_counter()
+    stats = db_data.write_data(batch, "stock_records")
+    results.append({"scenario": "ingest_stock_write_data",
+                    **_throughput(stats["inserted"], time.perf_counter() - started)})
+
+    frame = exchange_rate_frame(date_from, date_to)
+    started = time.perf_counter()
+    stats = db_data.write_frame(frame, "exchange_rate_records")
+    results.append({"scenario": "ingest_fx_write_frame",
+                    **_throughput(stats["inserted"], time.perf_counter() - started)})
+    return results
+
+
+def bench_lookups(args, date_from: datetime, date_to: datetime) -> List[dict]:
+    db_data = DbData()
+    names = tickers(args.tickers)
+    lookups = random_lookups(names, date_from, date_to, args.lookups)
+    results = [
+        {"scenario": "get_stock_price",
+         **_measure_latency([lambda t=t, d=d, c=c: db_data.get_stock_price(t, d, c) for t, d, c in lookups])},
+        {"scenario": "get_data_since",
+         **_measure_latency([lambda s=s: db_data.get_data_since(s, "stock_records") for s in (1, 2, 3)] * 20)},
+    ]
+    batch_tickers = names[:min(len(names), 100)]
+    started = time.perf_counter()
+    frame = db_data.get_stock_prices(batch_tickers, date_from, date_to, ["USD", "EUR", "ILS"])
+    results.append({"scenario": "get_stock_prices_batch", "tickers": len(batch_tickers),
+                    **_throughput(len(frame), time.perf_counter() - started)})
+    return results
+
+
+def _run_collector(collector, server: FakeApiServer, scenario: str) -> dict:
+    requests_before, limited_before = server.request_count, server.rate_limited_count
+    tracemalloc.start()
+    started = time.perf_counter()
+    stats = collector.collect()
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"scenario": scenario, **_throughput(stats["inserted"] + stats["modified"] + stats["unchanged"], seconds),
+            "peak_memory_bytes": peak, "http_requests": server.request_count - requests_before,
+            "rate_limited_responses": server.rate_limited_count - limited_before}
+
+
+def bench_collectors(args, date_from: datetime, date_to: datetime) -> List[dict]:
+    results = []
+    settings = DbSettings()
+    with FakeApiServer(rate_limit_every=args.rate_limit_every, max_page_size=args.page_size) as server:
+        polygon_config = SourceConfig(source_id=100, source_type="polygon", url_additional="BENCH",
+                                      scrape_since=date_from, token="bench", end_table="")
+        settings.add_source(polygon_config)
+        collector = PolygonCollector(settings.get_source_config(100), run_until=date_to)
+        collector.base_url = server.base_url
+        results.append(_run_collector(collector, server, "collector_polygon"))
+        results.append(_run_replay(settings, server, date_from, date_to))
+
+        frankfurter_config = SourceConfig(source_id=101, source_type="frankfurter", url_additional="USD,EUR,ILS",
+                                          scrape_since=date_from, end_table="")
+        settings.add_source(frankfurter_config)
+        collector = FrankfurterExchangeRateCollector(settings.get_source_config(101), run_until=date_to)
+        collector.base_url = f"{server.base_url}/v1/"
+        results.append(_run_collector(collector, server, "collector_frankfurter"))
+    return results
+
+
+def _run_replay(settings: DbSettings, server: FakeApiServer, date_from: datetime, date_to: datetime) -> dict:
+    # A cached run replayed right after it committed its rows must be served without any API request.
+    config = SourceConfig(source_id=102, source_type="polygon", url_additional="REPLAY",
+                          scrape_since=date_from, token="bench", end_table="")
+    settings.add_source(config)
+    previous_directory = os.environ.get("RESPONSE_CACHE_DIR")
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["RESPONSE_CACHE_DIR"] = directory
+        try:
+            collector = PolygonCollector(settings.get_source_config(102), run_until=date_to, cache_mode="on")
+            collector.base_url = server.base_url
+            collector.collect()
+            collector = PolygonCollector(settings.get_source_config(102), **replay_options(102, date_to))
+            collector.base_url = server.base_url
+            result = _run_collector(collector, server, "collector_polygon_replay")
+        finally:
+            if previous_directory is None:
+                os.environ.pop("RESPONSE_CACHE_DIR", None)
+            else:
+                os.environ["RESPONSE_CACHE_DIR"] = previous_directory
+    if result["http_requests"]:
+        raise RuntimeError(f"Replay made {result['http_requests']} API requests instead of using the cache")
+    return result
+
+
+def bench_checks(args, date_from: datetime, date_to: datetime) -> List[dict]:
+    # Correctness checks run against every backend; each raises RuntimeError on a mismatch.
+    return [_check_fx_paths(), _check_write_stats()]
+
+
+def _check_fx_paths() -> dict:
+    # With only EUR/USD and EUR/ILS stored, USD prices need the inverse pair for EUR and a cross rate for ILS.
+    db_data = DbData()
+    day = datetime(1990, 1, 3)
+    db_data.write_data([StockRecord(id="", source_id=900, stock_ticker="FXCHECK", date=day, open=10.0, high=10.0,
+                                    low=10.0, close=10.0, volume=1, base_currency="USD")])
+    db_data.write_data([
+        ExchangeRateRecord(id="", source_id=901, date=day, base_currency="EUR", target_currency="USD", rate=1.25),
+        ExchangeRateRecord(id="", source_id=901, date=day, base_currency="EUR", target_currency="ILS", rate=4.0),
+    ], "exchange_rate_records")
+    expected = {"USD": 10.0, "EUR": 8.0, "ILS": 32.0}
+    batch = db_data.get_stock_prices(["FXCHECK"], day, day, list(expected)).set_index("currency")["close"]
+    for currency, close in expected.items():
+        single = db_data.get_stock_price("FXCHECK", day, currency)
+        if not np.isclose(single, close) or not np.isclose(batch[currency], close):
+            raise RuntimeError(f"FXCHECK in {currency}: get_stock_price={single}, "
+                               f"get_stock_prices={batch[currency]}, expected {close}")
+    return {"scenario": "check_fx_paths", "currencies": len(expected)}
+
+
+def _check_write_stats() -> dict:
+    # A key repeated within a batch is written once; its superseded copy counts as unchanged.
+    db_data = DbData()
+
+    def record(day: int, close: float) -> StockRecord:
+        return StockRecord(id="", source_id=902, stock_ticker="STATSCHECK", date=datetime(1990, 1, day),
+                           open=1.0, high=1.0, low=1.0, close=close, volume=1, base_currency="USD")
+
+    stored = [record(day, 1.0) for day in (2, 3, 4)]
+    db_data.write_data(stored)
+    # Day 2 changes to 5.0 in its repeated copy: one modified, two unchanged plus the superseded copy.
+    stats = db_data.write_data(stored + [record(2, 5.0)])
+    _expect_stats("write_data", stats, {"inserted": 0, "modified": 1, "unchanged": 3, "failed": 0})
+    # Day 2 goes back to 1.0 and day 3 changes to 7.0 in its repeated copy.
+    columns = ["source_id", "stock_ticker", "date", "open", "high", "low", "close", "volume", "base_currency"]
+    frame = pd.DataFrame([{c: getattr(row, c) for c in columns} for row in stored + [record(3, 7.0)]])
+    stats = db_data.write_frame(frame)
+    _expect_stats("write_frame", stats, {"inserted": 0, "modified": 2, "unchanged": 2, "failed": 0})
+    return {"scenario": "check_write_stats", "batches": 2}
+
+
+def _expect_stats(name: str, stats: dict, expected: dict) -> None:
+    if stats != expected:
+        raise RuntimeError(f"{name} returned {stats}, expected {expected}")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=200, help="Synthetic tickers to ingest.")
+    parser.add_argument("--years", type=int, default=3, help="Years of daily history per ticker.")
+    parser.add_argument("--lookups", type=int, default=1000, help="Random get_stock_price calls.")
+    parser.add_argument("--page-size", type=int, default=100, help="Fake Polygon page size.")
+    parser.add_argument("--rate-limit-every", type=int, default=5, help="Fake servers answer every Nth request with 429.")
+    parser.add_argument("--postgres-url", default=os.getenv("BENCH_POSTGRES_URL"),
+                        help="Dedicated PostgreSQL database; its tables are dropped and recreated.")
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args()
+
+    date_to = datetime(2025, 1, 1)
+    date_from = datetime(date_to.year - args.years, 1, 1)
+    with tempfile.TemporaryDirectory() as directory:
+        db_urls = [f"sqlite:///{os.path.join(directory, 'bench.db')}"]
+        if args.postgres_url:
+            db_urls.append(args.postgres_url)
+        results = []
+        for db_url in db_urls:
+            _reset_database(db_url)
+            backend = get_engine(db_url).dialect.name
+            for bench in (bench_checks, bench_ingestion, bench_lookups, bench_collectors):
+                for result in bench(args, date_from, date_to):
+                    results.append({"backend": backend, **result})
+                    print(json.dumps(results[-1]))
+            get_engine(db_url).dispose()
+
+    report = {
+        "started_at": datetime.now().isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k != "postgres_url"},
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,53 @@
+import asyncio
+import contextvars
 import logging
+import os
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
 
-import requests
+import pandas as pd
 from tqdm import tqdm
-from typing import List, Dict, Optional
-import time
+from typing import Callable, Iterator, List, Dict, Optional, Tuple
 
 from requests.exceptions import HTTPError, RequestException
 
+from section_1 import metrics
 from section_1.collectors.data_classes import StockRecord, ExchangeRateRecord
+from section_1.collectors.http_transport import get_transport
+from section_1.collectors.rate_limiter import get_rate_limiter
+from section_1.collectors.response_cache import (
+    ResponseCacheMiss, get_cache_mode, get_response_cache, normalize_url
+)
 from section_1.database import DbData
 from section_1.models import SourceConfig
 
 
 class BaseDataCollector(ABC):
-    def __init__(self, source_config: SourceConfig):
+    # Note: Collectors of the same provider share one rate limiter across worker threads.
+    provider: str = "default"
+    # Note: Set by collectors that implement iter_frames and load through DbData.write_frame.
+    columnar: bool = False
+    # Note: Length of the date windows long ranges are split into by _date_windows.
+    window_days: int = 365
+
+    def __init__(self, source_config: SourceConfig, batch_size: Optional[int] = None,
+                 progress_hook: Optional[Callable[[int], None]] = None, cache_mode: Optional[str] = None,
+                 run_until: Optional[datetime] = None, start_since: Optional[datetime] = None):
         self.config = source_config
+        # Note: Records are written and committed every batch_size rows; progress_hook gets each batch's size.
+        self.batch_size = batch_size or int(os.getenv("COLLECT_BATCH_SIZE", "5000"))
+        self.progress_hook = progress_hook
+        # Note: "on" reads through the response cache and records the run's date range, "replay" serves
+        # every request from it; pin start_since and run_until to the recorded range so replayed requests
+        # match the cached URLs (see main.replay_scrape).
+        self.cache_mode = get_cache_mode(cache_mode)
+        self.response_cache = get_response_cache() if self.cache_mode != "off" else None
+        self.run_until = run_until or datetime.now()
+        self.rate_limiter = get_rate_limiter(self.provider)
+        self.transport = get_transport()
         self.db_data = DbData()
-        self.start_since = self.get_start_since()
+        self.start_since = start_since or self.get_start_since()
         self.logger = logging.getLogger(self.__class__.__name__)
 
     def get_start_since(self):
@@ -29,33 +59,107 @@ class BaseDataCollector(ABC):
         return max(data_since, config_since)
 
     def collect(self):
-        raw_data = self.get_raw_data()
-        filtered_data = self.filter_data(raw_data)
-        results: List[StockRecord] = []
-        if filtered_data:
-            for row in tqdm(filtered_data):
-                record = self.process_row(row)
-                if record is not None:
-                    results.append(record)
-        stats = self.db_data.write_data(results)
+        stats = {"inserted": 0, "modified": 0, "unchanged": 0, "failed": 0}
+        end_table = self.config.end_table or "stock_records"
+        # Note: Columnar collectors hand DataFrames straight to the bulk loader, skipping per-row objects.
+        if self.columnar:
+            batches, write = self.iter_frame_batches(), self.db_data.write_frame
+        else:
+            batches, write = self.iter_record_batches(), self.db_data.write_data
+        if self.cache_mode == "on":
+            self.response_cache.record_run(self.config.source_id, self.start_since, self.run_until)
+        self.db_data.mark_source_run(self.config.source_id, "running")
+        try:
+            stats = self._collect_batches(batches, write, end_table, stats)
+        except Exception:
+            self.db_data.mark_source_run(self.config.source_id, "failed")
+            raise
+        self.db_data.mark_source_run(self.config.source_id, "success")
         self.logger.info(f"stats: {stats}")
         return stats
 
-    def _make_api_request(self, url: str, retry=0) -> dict:
+    def _collect_batches(self, batches, write: Callable, end_table: str, stats: dict) -> dict:
+        with metrics.track_run(self.config.source_id, self.config.source_type) as run:
+            # Note: A single writer thread commits batch N while the next pages are fetched and processed.
+            with ThreadPoolExecutor(max_workers=1) as writer:
+                pending: Optional[Future] = None
+                try:
+                    for batch in batches:
+                        pending = self._flush(writer, pending, write, batch, end_table, stats)
+                finally:
+                    # Note: Batches already handed to the writer are still committed if fetching fails midway.
+                    if pending is not None:
+                        self._merge_stats(stats, pending.result())
+                    run.stats = stats
+        return stats
+
+    def iter_records(self) -> Iterator[StockRecord | ExchangeRateRecord]:
+        for raw_page in self.iter_raw_pages():
+            for row in self.filter_data(raw_page) or []:
+                with metrics.stage("process_row"):
+                    record = self.process_row(row)
+                if record is not None:
+                    yield record
+
+    def iter_record_batches(self) -> Iterator[List[StockRecord | ExchangeRateRecord]]:
+        batch = []
+        for record in self.iter_records():
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def iter_frame_batches(self) -> Iterator[pd.DataFrame]:
+        for frame in self.iter_frames():
+            frame = self.filter_frame(frame)
+            for start in range(0, len(frame), self.batch_size):
+                yield frame.iloc[start:start + self.batch_size]
+
+    def iter_raw_pages(self) -> Iterator[List[Dict]]:
+        # Collectors backed by paginated APIs override this to stream their pages.
+        yield self.get_raw_data()
+
+    def iter_frames(self) -> Iterator[pd.DataFrame]:
+        # Columnar collectors yield DataFrames holding the end table's columns.
+        raise NotImplementedError(f"{self.__class__.__name__} does not support columnar collection")
+
+    def filter_frame(self, frame: pd.DataFrame) -> pd.DataFrame:
+        # Columnar counterpart of filter_data.
+        return frame
+
+    @classmethod
+    def _date_windows(cls, date_start: datetime, date_end: datetime) -> Iterator[Tuple[datetime, datetime]]:
+        # Splits [date_start, date_end] into consecutive, inclusive windows of at most window_days days.
+        window_start = date_start
+        while window_start <= date_end:
+            window_end = min(window_start + timedelta(days=cls.window_days - 1), date_end)
+            yield window_start, window_end
+            window_start = window_end + timedelta(days=1)
+
+    def _flush(self, writer: ThreadPoolExecutor, pending: Optional[Future], write: Callable,
+               batch, end_table: str, stats: dict) -> Future:
+        # Waits for the previous batch, so at most one batch is being written at a time.
+        if pending is not None:
+            self._merge_stats(stats, pending.result())
+        if self.progress_hook is not None:
+            self.progress_hook(len(batch))
+        # Note: The writer runs in the caller's context so its queries are attributed to this run.
+        return writer.submit(contextvars.copy_context().run, write, batch, end_table)
+
+    @staticmethod
+    def _merge_stats(stats: dict, batch_stats: dict) -> None:
+        for key in stats:
+            stats[key] += batch_stats.get(key, 0)
+
+    def _make_api_request(self, url: str) -> dict:
+        cached = self._get_cached_response(url)
+        if cached is not None:
+            return cached
         self.logger.info(f"Making API request to {url}")
         try:
-            response = requests.get(url, timeout=20)
-            if response.status_code == 429:
-                retry_after = response.headers.get("Retry-After", 60)
-                error_msg = f"Rate limit exceeded. Retry after {retry_after} seconds."
-                self.logger.error(error_msg)
-                if retry >= 3:
-                    raise Exception("Rate limit exceeded")
-                time.sleep(int(retry_after))
-                return self._make_api_request(url)
-            response.raise_for_status()
-            data = response.json()
-            return data
+            data = self.transport.get_json(url, rate_limiter=self.rate_limiter)
         except HTTPError as http_err:
             self.logger.error(f"HTTP error occurred: {http_err}")
             raise
@@ -65,6 +169,31 @@ class BaseDataCollector(ABC):
         except Exception as err:
             self.logger.error(f"Unexpected error: {err}")
             raise
+        if self.response_cache is not None:
+            self.response_cache.put(url, data)
+        return data
+
+    def _make_api_requests(self, urls: List[str], concurrency: int = 4) -> List[dict]:
+        # Fetches several URLs at once through the async transport; results keep the order of urls.
+        results = [self._get_cached_response(url) for url in urls]
+        missing = [url for url, result in zip(urls, results) if result is None]
+        if missing:
+            self.logger.info(f"Making {len(missing)} API requests")
+            fetched = iter(asyncio.run(self.transport.get_many_json(missing, self.rate_limiter, concurrency)))
+            for index, url in enumerate(urls):
+                if results[index] is None:
+                    results[index] = next(fetched)
+                    if self.response_cache is not None:
+                        self.response_cache.put(url, results[index])
+        return results
+
+    def _get_cached_response(self, url: str) -> Optional[dict]:
+        if self.response_cache is None:
+            return None
+        cached = self.response_cache.get(url, allow_expired=self.cache_mode == "replay")
+        if cached is None and self.cache_mode == "replay":
+            raise ResponseCacheMiss(f"No cached response for {normalize_url(url)}")
+        return cached
 
     def filter_data(self, data: List[Dict]) -> List[Dict]:
         # An example method that could add to the base class.
@@ -77,3 +206,9 @@ class BaseDataCollector(ABC):
     @abstractmethod
     def process_row(self, row: Dict) -> Optional[StockRecord | ExchangeRateRecord]:
         pass
+
+
+def tqdm_progress_hook(description: Optional[str] = None) -> Callable[[int], None]:
+    # Progress hook that reports written records on a tqdm bar.
+    progress_bar = tqdm(desc=description, unit="records")
+    return progress_bar.update
@@ -1,8 +1,10 @@
 from section_1.collectors.exchange_rate_collector import FrankfurterExchangeRateCollector
 from section_1.collectors.polygon_collector import PolygonCollector
+from section_1.collectors.polygon_grouped_collector import PolygonGroupedDailyCollector
 
 collectors = {
     "polygon": PolygonCollector,
+    "polygon_grouped": PolygonGroupedDailyCollector,
     "frankfurter": FrankfurterExchangeRateCollector
 }
 
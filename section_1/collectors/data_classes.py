@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from datetime import datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class StockRecord:
     id: str
     source_id: int
@@ -16,7 +16,7 @@ class StockRecord:
     base_currency: str
 
 
-@dataclass
+@dataclass(slots=True)
 class ExchangeRateRecord:
     id: str
     source_id: int
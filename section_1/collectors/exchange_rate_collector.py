@@ -1,41 +1,74 @@
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from section_1 import metrics
 from section_1.collectors.base_data_collector import BaseDataCollector
 from section_1.collectors.data_classes import ExchangeRateRecord
 from section_1.models import SourceConfig
 
+# Note: Ranges are fetched in the base class's date windows, WINDOW_CONCURRENCY windows at a time.
+WINDOW_CONCURRENCY = 4
+
 
 class FrankfurterExchangeRateCollector(BaseDataCollector):
-    def __init__(self, source_config: SourceConfig):
-        super().__init__(source_config)
-        self.base_url = "https://api.frankfurter.dev/v1/"
+    """
+    Collects exchange rates for one or more base currencies, given as a comma-separated
+    url_additional (e.g. "USD,EUR,ILS"). Only the first base is fetched; the other bases'
+    rates are derived locally as cross rates of that series.
+    """
+    provider = "frankfurter"
+    columnar = True
 
-    def collect(self):
-        result_rates = self.get_raw_data()
-        results = []
-        for date_rate in result_rates:
-            for target_currency, rate in date_rate["rates"].items():
-                record = self.process_row({"date": date_rate["date"],
-                                           "base_currency": self.config.url_additional,
-                                           "target_currency": target_currency,
-                                           "rate": rate
-                                           })
-                if record:
-                    results.append(record)
-        stats = self.db_data.write_data(results, self.config.end_table)
-        self.logger.info(f"stats: {stats}")
-        return stats
+    def __init__(self, source_config: SourceConfig, **kwargs):
+        super().__init__(source_config, **kwargs)
+        self.base_url = "https://api.frankfurter.dev/v1/"
+        self.base_currencies = [c.strip().upper() for c in self.config.url_additional.split(",") if c.strip()]
 
     def get_raw_data(self) -> List[Dict]:
-        url = f"{self.base_url}{self.start_since.strftime('%Y-%m-%d')}..?base={self.config.url_additional}"
-        # Pagination is unnecessary
-        # the APIs support data requests spanning over one year.
-        data = self._make_api_request(url)
-        result_rates = [
-            {"rates": rates, "date": date, "base_currency": self.config.url_additional}
-            for date, rates in data.get("rates", {}).items()
-        ]
-        return result_rates
+        return [row for page in self.iter_raw_pages() for row in page]
+
+    def iter_raw_pages(self) -> Iterator[List[Dict]]:
+        for frame in self.iter_frames():
+            yield frame.assign(date=frame["date"].dt.strftime("%Y-%m-%d")).to_dict(orient="records")
+
+    def iter_frames(self) -> Iterator[pd.DataFrame]:
+        pivot = self.base_currencies[0]
+        windows = list(self._date_windows(self.start_since, self.run_until))
+        for start in range(0, len(windows), WINDOW_CONCURRENCY):
+            urls = [f"{self.base_url}{window_start.strftime('%Y-%m-%d')}..{window_end.strftime('%Y-%m-%d')}"
+                    f"?base={pivot}"
+                    for window_start, window_end in windows[start:start + WINDOW_CONCURRENCY]]
+            for data in self._make_api_requests(urls, concurrency=WINDOW_CONCURRENCY):
+                with metrics.stage("parse"):
+                    frame = self._cross_rate_frame(data.get("rates", {}), pivot)
+                if not frame.empty:
+                    yield frame
+
+    def _cross_rate_frame(self, rates: Dict[str, Dict[str, float]], pivot: str) -> pd.DataFrame:
+        # Wide (date x currency) pivot rates; rate(base -> target) = rate(pivot -> target) / rate(pivot -> base).
+        wide = pd.DataFrame.from_dict(rates, orient="index", dtype=float)
+        if wide.empty:
+            return pd.DataFrame()
+        wide[pivot] = 1.0
+        wide.index = pd.to_datetime(wide.index)
+        wide.index.name = "date"
+        wide.columns.name = "target_currency"
+        frames = []
+        for base_currency in self.base_currencies:
+            if base_currency not in wide:
+                self.logger.info(f"No {pivot} rate for base currency {base_currency}, skipping it.")
+                continue
+            cross = wide.div(wide[base_currency], axis=0).drop(columns=base_currency)
+            # Note: pandas 3 keeps NaN in stack(); days missing the base or a target have no rate to write.
+            long = cross.stack().dropna().rename("rate").reset_index()
+            frames.append(long.assign(base_currency=base_currency))
+        if not frames:
+            return pd.DataFrame()
+        frame = pd.concat(frames, ignore_index=True)
+        frame["source_id"] = self.config.source_id
+        return frame[["source_id", "date", "base_currency", "target_currency", "rate"]]
 
     def process_row(self, row) -> Optional[ExchangeRateRecord]:
         try:
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, Timeout
+
+from section_1 import metrics
+from section_1.collectors.rate_limiter import TokenBucket
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class HttpTransport:
+    """
+    Pooled keep-alive HTTP transport shared by all collectors.
+    Retries timeouts, connection errors, 429 and 5xx responses with bounded exponential
+    backoff and full jitter, honouring Retry-After when the server sends one.
+    """
+
+    def __init__(self, max_retries: int = 4, backoff_base: float = 1.0, backoff_max: float = 60.0,
+                 connections_per_host: int = 10, timeout: float = 20):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.session = requests.Session()
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate"})
+        # Note: pool_block caps concurrent connections per host instead of opening extra ones.
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=connections_per_host, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return None
+
+    def get(self, url: str, rate_limiter: Optional[TokenBucket] = None) -> requests.Response:
+        attempt = 0
+        while True:
+            if rate_limiter is not None:
+                with metrics.stage("rate_limit_wait"):
+                    rate_limiter.acquire()
+            if attempt:
+                metrics.increment("http_retries")
+            metrics.increment("http_requests")
+            try:
+                with metrics.stage("http_fetch"):
+                    response = self.session.get(url, timeout=self.timeout)
+                    metrics.increment("bytes_downloaded", len(response.content))
+            except (Timeout, ConnectionError) as err:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                self.logger.warning(f"Request failed ({err}), retrying in {delay:.1f} seconds.")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    response.raise_for_status()
+                    return response
+                retry_after = self._retry_after(response)
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                delay = min(delay, self.backoff_max)
+                self.logger.error(f"HTTP {response.status_code} received. Retry after {delay:.1f} seconds.")
+                if response.status_code == 429:
+                    metrics.increment("http_rate_limited")
+                if response.status_code == 429 and rate_limiter is not None:
+                    # Note: The limiter waits out the pause, and other workers on the same provider wait too.
+                    rate_limiter.block_for(delay)
+                    delay = 0
+            time.sleep(delay)
+            attempt += 1
+
+    def get_json(self, url: str, rate_limiter: Optional[TokenBucket] = None) -> dict:
+        response = self.get(url, rate_limiter)
+        with metrics.stage("parse"):
+            return response.json()
+
+    async def get_json_async(self, url: str, rate_limiter: Optional[TokenBucket] = None) -> dict:
+        return await asyncio.to_thread(self.get_json, url, rate_limiter)
+
+    async def get_many_json(self, urls: Iterable[str], rate_limiter: Optional[TokenBucket] = None,
+                            concurrency: int = 8) -> List[dict]:
+        # Fetches the URLs concurrently over the shared pool; results keep the order of urls.
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(url: str) -> dict:
+            async with semaphore:
+                return await self.get_json_async(url, rate_limiter)
+
+        return list(await asyncio.gather(*[fetch(url) for url in urls]))
+
+
+_transports: Dict[str, HttpTransport] = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(name: str = "default") -> HttpTransport:
+    with _transports_lock:
+        transport = _transports.get(name)
+        if transport is None:
+            transport = HttpTransport(
+                max_retries=int(os.getenv("HTTP_MAX_RETRIES", "4")),
+                backoff_max=float(os.getenv("HTTP_BACKOFF_MAX_SECONDS", "60")),
+                connections_per_host=int(os.getenv("HTTP_CONNECTIONS_PER_HOST", "10")),
+            )
+            _transports[name] = transport
+    return transport
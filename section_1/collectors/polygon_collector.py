@@ -1,37 +1,86 @@
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List
+
 import pandas as pd
-from datetime import datetime
-from typing import List, Dict
 
+from section_1 import metrics
 from section_1.collectors.base_data_collector import BaseDataCollector
 from section_1.collectors.data_classes import StockRecord
 from section_1.models import SourceConfig
 
+# Note: Polygon's maximum aggregates page size; longer ranges are split into windows and paged via next_url.
+MAX_PAGE_SIZE = 50000
+
 
 class PolygonCollector(BaseDataCollector):
-    def __init__(self, source_config: SourceConfig):
-        super().__init__(source_config)
+    provider = "polygon"
+    columnar = True
+
+    def __init__(self, source_config: SourceConfig, **kwargs):
+        super().__init__(source_config, **kwargs)
         self.base_url = "https://api.polygon.io"
 
     def get_raw_data(self) -> List[Dict]:
+        return [row for page in self.iter_raw_pages() for row in page]
+
+    def iter_raw_pages(self) -> Iterator[List[Dict]]:
         ticker = self.config.url_additional
-        date_start = self.start_since
-        date_end = datetime.now()
-        date_start_str = date_start.strftime("%Y-%m-%d")
-        date_end_str = date_end.strftime("%Y-%m-%d")
-        url = (f"{self.base_url}/v2/aggs/ticker/{ticker}/range/1/day/"
-               f"{date_start_str}/{date_end_str}?adjusted=true&sort=asc&limit=120&apiKey={self.config.token}")
-        # Pagination is unnecessary
-        # the APIs support data requests spanning over one year.
-        data = self._make_api_request(url)
-        if "results" not in data:
-            raise ValueError(f"Polygon response missing 'results': {data}")
-        df = pd.DataFrame(data["results"])
+        for results in self._iter_result_pages():
+            yield [self._parse_result(result, ticker) for result in results]
+
+    def iter_frames(self) -> Iterator[pd.DataFrame]:
+        # Builds each page's columns directly, without per-row dicts or records.
+        ticker = self.config.url_additional.upper()
+        for results in self._iter_result_pages():
+            with metrics.stage("parse"):
+                frame = self._results_frame(results, ticker)
+            yield frame
+
+    def _results_frame(self, results: List[Dict], ticker: str) -> pd.DataFrame:
+        page = pd.DataFrame(results, columns=["t", "o", "h", "l", "c", "v"])
+        return pd.DataFrame({
+            "source_id": self.config.source_id,
+            # Note: Normalize timestamp to ensure only date is stored.
+            "date": pd.to_datetime(page["t"], unit="ms").dt.normalize(),
+            "open": page["o"],
+            "high": page["h"],
+            "low": page["l"],
+            "close": page["c"],
+            "volume": page["v"],
+            "stock_ticker": ticker,
+            "base_currency": "USD",
+        })
+
+    def _iter_result_pages(self) -> Iterator[List[Dict]]:
+        # Splits the range into windows and follows next_url within each, yielding one page at a time.
+        ticker = self.config.url_additional
+        date_end = self.run_until
+        for window_start, window_end in self._date_windows(self.start_since, date_end):
+            url = (f"{self.base_url}/v2/aggs/ticker/{ticker}/range/1/day/"
+                   f"{window_start.strftime('%Y-%m-%d')}/{window_end.strftime('%Y-%m-%d')}"
+                   f"?adjusted=true&sort=asc&limit={MAX_PAGE_SIZE}&apiKey={self.config.token}")
+            while url:
+                data = self._make_api_request(url)
+                if "results" not in data and data.get("resultsCount") != 0:
+                    raise ValueError(f"Polygon response missing 'results': {data}")
+                yield data.get("results", [])
+                # Note: next_url does not carry the API key, so it is appended on every page.
+                next_url = data.get("next_url")
+                url = f"{next_url}&apiKey={self.config.token}" if next_url else None
+
+    @staticmethod
+    def _parse_result(result: Dict, ticker: str) -> Dict:
         # Note: Normalize timestamp to ensure only date is stored.
-        df["date"] = pd.to_datetime(df["t"], unit="ms").dt.normalize()
-        df = df[["date", "o", "h", "l", "c", "v"]]
-        df.rename(columns={"o": "open", "h": "high", "l": "low", "c": "close", "v": "volume"}, inplace=True)
-        df["stock_ticker"] = ticker.upper()
-        return df.to_dict(orient="records")
+        timestamp = datetime.fromtimestamp(result["t"] / 1000, tz=timezone.utc)
+        return {
+            "date": datetime(timestamp.year, timestamp.month, timestamp.day),
+            "open": result["o"],
+            "high": result["h"],
+            "low": result["l"],
+            "close": result["c"],
+            "volume": result["v"],
+            "stock_ticker": ticker.upper(),
+        }
 
     def process_row(self, row: Dict) -> StockRecord:
         return StockRecord(
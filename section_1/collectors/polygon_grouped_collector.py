@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+import pandas as pd
+
+from section_1 import metrics
+from section_1.collectors.polygon_collector import PolygonCollector
+from section_1.models import SourceConfig
+
+# Note: Each request covers one trading day for the whole market; DAY_CONCURRENCY days are fetched at a time.
+DAY_CONCURRENCY = 4
+
+
+class PolygonGroupedDailyCollector(PolygonCollector):
+    """
+    Collects daily bars for every US stock through Polygon's grouped daily endpoint, one request per day.
+    url_additional is an optional comma-separated ticker allow-list; when empty, all tickers are kept.
+    """
+
+    def __init__(self, source_config: SourceConfig, **kwargs):
+        super().__init__(source_config, **kwargs)
+        self.tickers = {t.strip().upper() for t in (self.config.url_additional or "").split(",") if t.strip()}
+
+    def iter_raw_pages(self) -> Iterator[List[Dict]]:
+        for date, results in self._iter_daily_results():
+            yield [dict(self._parse_result(result, result["T"]), date=date) for result in results]
+
+    def iter_frames(self) -> Iterator[pd.DataFrame]:
+        for date, results in self._iter_daily_results():
+            with metrics.stage("parse"):
+                frame = self._grouped_frame(results, date)
+            if not frame.empty:
+                yield frame
+
+    def filter_data(self, data: List[Dict]) -> List[Dict]:
+        if not self.tickers:
+            return data
+        return [row for row in data if row["stock_ticker"] in self.tickers]
+
+    def filter_frame(self, frame: pd.DataFrame) -> pd.DataFrame:
+        if not self.tickers:
+            return frame
+        return frame[frame["stock_ticker"].isin(self.tickers)]
+
+    def _grouped_frame(self, results: List[Dict], date: datetime) -> pd.DataFrame:
+        page = pd.DataFrame(results, columns=["T", "o", "h", "l", "c", "v"])
+        return pd.DataFrame({
+            "source_id": self.config.source_id,
+            # Note: Every bar of a grouped response belongs to the requested date.
+            "date": pd.Timestamp(date),
+            "open": page["o"],
+            "high": page["h"],
+            "low": page["l"],
+            "close": page["c"],
+            "volume": page["v"],
+            "stock_ticker": page["T"].str.upper(),
+            "base_currency": "USD",
+        })
+
+    def _iter_daily_results(self) -> Iterator[tuple]:
+        days = list(self._trading_days(self.start_since, self.run_until))
+        for start in range(0, len(days), DAY_CONCURRENCY):
+            chunk = days[start:start + DAY_CONCURRENCY]
+            urls = [f"{self.base_url}/v2/aggs/grouped/locale/us/market/stocks/{day.strftime('%Y-%m-%d')}"
+                    f"?adjusted=true&apiKey={self.config.token}" for day in chunk]
+            for day, data in zip(chunk, self._make_api_requests(urls, concurrency=DAY_CONCURRENCY)):
+                # Note: Market holidays answer with resultsCount 0 and no results.
+                if "results" not in data and data.get("resultsCount") != 0:
+                    raise ValueError(f"Polygon response missing 'results': {data}")
+                yield day, data.get("results", [])
+
+    @staticmethod
+    def _trading_days(date_start: datetime, date_end: datetime) -> Iterator[datetime]:
+        # Weekends are skipped up front; holidays still cost one (empty) request.
+        day = datetime(date_start.year, date_start.month, date_start.day)
+        while day <= date_end:
+            if day.weekday() < 5:
+                yield day
+            day += timedelta(days=1)
@@ -0,0 +1,64 @@
+import os
+import threading
+import time
+from typing import Dict
+
+# Note: Calls per minute per provider; Polygon's free tier allows 5, Frankfurter publishes no hard limit.
+DEFAULT_CALLS_PER_MINUTE = {
+    "polygon": 5,
+    "frankfurter": 600,
+}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every collector of one provider.
+    A rate-limit response blocks the whole bucket, so all workers back off together.
+    """
+
+    def __init__(self, calls_per_minute: float, capacity: int = None):
+        self.rate = calls_per_minute / 60.0
+        self.capacity = capacity or max(1, int(calls_per_minute))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> None:
+        # Blocks the calling worker until a token is available.
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._blocked_until - now
+                if wait <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def block_for(self, seconds: float) -> None:
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> TokenBucket:
+    # Limits can be overridden per provider, e.g. RATE_LIMIT_POLYGON_PER_MINUTE=100 on a paid plan.
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            default = DEFAULT_CALLS_PER_MINUTE.get(provider, 60)
+            calls_per_minute = float(os.getenv(f"RATE_LIMIT_{provider.upper()}_PER_MINUTE", default))
+            limiter = TokenBucket(calls_per_minute)
+            _limiters[provider] = limiter
+    return limiter
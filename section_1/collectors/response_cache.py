@@ -0,0 +1,151 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Note: Runs kept per source in the run log, newest last.
+MAX_RECORDED_RUNS = 100
+# Note: Credentials are stripped from the URL before hashing, so cache keys and files never hold them.
+SECRET_QUERY_PARAMS = {"apikey", "api_key", "token", "access_token"}
+CACHE_MODES = ("off", "on", "replay")
+
+
+class ResponseCacheMiss(Exception):
+    pass
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if k.lower() not in SECRET_QUERY_PARAMS)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, urlencode(query), ""))
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of JSON API responses, keyed by the normalized URL.
+    Entries expire after ttl_seconds (replays may still read them) and the least recently
+    used entries are evicted once the cache grows past max_bytes.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: float = 86400, max_bytes: int = 1024 ** 3):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(os.path.getsize(path) for path, _ in self._entries())
+
+    def _path(self, url: str) -> str:
+        key = hashlib.sha256(normalize_url(url).encode()).hexdigest()
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
+
+    def get(self, url: str, allow_expired: bool = False) -> Optional[dict]:
+        path = self._path(url)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as file:
+                entry = json.load(file)
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        if not allow_expired and time.time() - entry["fetched_at"] > self.ttl_seconds:
+            return None
+        # Note: Touching the file marks it as recently used for eviction.
+        os.utime(path)
+        return entry["payload"]
+
+    def put(self, url: str, payload: dict) -> None:
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {"url": normalize_url(url), "fetched_at": time.time(), "payload": payload}
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(temp_path, "wt", encoding="utf-8") as file:
+            json.dump(entry, file)
+        size = os.path.getsize(temp_path)
+        with self._lock:
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(temp_path, path)
+            self._total_bytes += size - previous
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _runs_path(self, source_id: int) -> str:
+        return os.path.join(self.directory, "runs", f"source_{source_id}.json")
+
+    def record_run(self, source_id: int, start_since: datetime, run_until: datetime) -> None:
+        # Stores the date range a cached run requested, so a replay can rebuild the same URLs.
+        path = self._runs_path(source_id)
+        with self._lock:
+            runs = self._load_runs(path)
+            runs.append({"start_since": start_since.isoformat(), "run_until": run_until.isoformat(),
+                         "recorded_at": time.time()})
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f"{path}.tmp", "w") as file:
+                json.dump(runs[-MAX_RECORDED_RUNS:], file)
+            os.replace(f"{path}.tmp", path)
+
+    def get_run(self, source_id: int, run_until: Optional[datetime] = None) -> Optional[Dict[str, datetime]]:
+        # The latest recorded run of the source, or the latest one that ended at run_until.
+        with self._lock:
+            runs = self._load_runs(self._runs_path(source_id))
+        for run in reversed(runs):
+            if run_until is None or datetime.fromisoformat(run["run_until"]) == run_until:
+                return {"start_since": datetime.fromisoformat(run["start_since"]),
+                        "run_until": datetime.fromisoformat(run["run_until"])}
+        return None
+
+    @staticmethod
+    def _load_runs(path: str) -> list:
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return []
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json.gz"):
+                    path = os.path.join(root, name)
+                    yield path, os.path.getmtime(path)
+
+    def _evict(self) -> None:
+        # Removes least recently used entries until the cache is back under 90% of max_bytes.
+        for path, _ in sorted(self._entries(), key=lambda entry: entry[1]):
+            if self._total_bytes <= self.max_bytes * 0.9:
+                break
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                self._total_bytes -= size
+            except FileNotFoundError:
+                continue
+
+
+_caches: Dict[str, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache_mode(cache_mode: Optional[str] = None) -> str:
+    cache_mode = (cache_mode or os.getenv("RESPONSE_CACHE_MODE", "off")).lower()
+    if cache_mode not in CACHE_MODES:
+        raise ValueError(f"Unknown response cache mode: {cache_mode}")
+    return cache_mode
+
+
+def get_response_cache() -> ResponseCache:
+    directory = os.getenv("RESPONSE_CACHE_DIR", ".response_cache")
+    with _caches_lock:
+        cache = _caches.get(directory)
+        if cache is None:
+            cache = ResponseCache(
+                directory,
+                ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "86400")),
+                max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(1024 ** 3))),
+            )
+            _caches[directory] = cache
+    return cache
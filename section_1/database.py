@@ -1,14 +1,28 @@
 import abc
+import io
 import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+from functools import partial
+import numpy as np
+import pandas as pd
 from sqlalchemy import (
-    create_engine, Column, Integer, String, DateTime, Float, Date, ForeignKey
+    create_engine, Column, Integer, String, DateTime, Float, Date, ForeignKey,
+    UniqueConstraint, Index, Table, MetaData, and_, exists, func, inspect, insert, or_, text, update
 )
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session, declarative_base
 from sqlalchemy.future import select
 from dotenv import load_dotenv
-from typing import List
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 from section_1.collectors.data_classes import StockRecord, ExchangeRateRecord
+from section_1.fx_cache import FxRateCache
+from section_1.metrics import instrument_engine, stage
 from section_1.models import SourceConfig
 
 load_dotenv()
@@ -34,6 +48,12 @@ class SourceTypeEndTable(Base):
 
 class StockRecordModel(Base):
     __tablename__ = "stock_records"
+    __table_args__ = (
+        UniqueConstraint("source_id", "date", "stock_ticker", name="uq_stock_records_natural_key"),
+        # Note: Serves price lookups by ticker and date.
+        Index("ix_stock_records_ticker_date", "stock_ticker", "date"),
+        Index("ix_stock_records_updated_at", "updated_at"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     source_id = Column(Integer, ForeignKey("sources.source_id"))
     date = Column(DateTime, nullable=False)
@@ -44,43 +64,269 @@ class StockRecordModel(Base):
     volume = Column(Integer, nullable=False)
     stock_ticker = Column(String, nullable=False)
     base_currency = Column(String, nullable=False)
+    # Note: Set whenever the row is inserted or its values change; incremental exports select on it.
+    updated_at = Column(DateTime)
 
 
 class ExchangeRateRecordModel(Base):
     __tablename__ = "exchange_rate_records"
+    __table_args__ = (
+        UniqueConstraint("source_id", "date", "base_currency", "target_currency",
+                         name="uq_exchange_rate_records_natural_key"),
+        # Note: Serves currency conversion lookups by pair and date.
+        Index("ix_exchange_rate_records_pair_date", "base_currency", "target_currency", "date"),
+        Index("ix_exchange_rate_records_updated_at", "updated_at"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     source_id = Column(Integer, ForeignKey("sources.source_id"))
     date = Column(DateTime, nullable=False)
     base_currency = Column(String, nullable=False)
     target_currency = Column(String, nullable=False)
     rate = Column(Float, nullable=False)
+    updated_at = Column(DateTime)
+
+
+class StockPriceConvertedModel(Base):
+    # Note: Precomputed OHLC per ticker, date and configured currency, maintained by DbData on every write.
+    __tablename__ = "stock_prices_converted"
+    __table_args__ = (
+        UniqueConstraint("stock_ticker", "date", "currency", name="uq_stock_prices_converted_key"),
+    )
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    stock_ticker = Column(String, nullable=False)
+    date = Column(DateTime, nullable=False)
+    currency = Column(String, nullable=False)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    volume = Column(Integer, nullable=False)
+
+
+class SourceWatermarkModel(Base):
+    # Note: One row per source (sub_key "") and per ticker or "BASE/TARGET" pair, advanced with every write batch.
+    __tablename__ = "source_watermarks"
+    __table_args__ = (
+        UniqueConstraint("source_id", "sub_key", name="uq_source_watermarks_key"),
+    )
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    source_id = Column(Integer, ForeignKey("sources.source_id"), nullable=False)
+    sub_key = Column(String, nullable=False, default="")
+    last_date = Column(DateTime)
+    rows_written = Column(Integer, nullable=False, default=0)
+    last_run_status = Column(String)
+    last_run_at = Column(DateTime)
+    updated_at = Column(DateTime)
+
+
+TABLE_MODELS = {
+    "stock_records": StockRecordModel,
+    "exchange_rate_records": ExchangeRateRecordModel,
+}
+
+# Note: Natural key and the columns refreshed on conflict, per end table.
+NATURAL_KEYS = {
+    "stock_records": ("source_id", "date", "stock_ticker"),
+    "exchange_rate_records": ("source_id", "date", "base_currency", "target_currency"),
+}
+UPDATE_COLUMNS = {
+    "stock_records": ("open", "high", "low", "close", "volume"),
+    "exchange_rate_records": ("rate",),
+}
+# Note: Maintained by the write path rather than taken from records.
+WRITE_TIMESTAMP_COLUMN = "updated_at"
+RECORD_TYPES = {
+    "stock_records": StockRecord,
+    "exchange_rate_records": ExchangeRateRecord,
+}
+
+# Note: Key and refreshed columns of stock_prices_converted, which is upserted like the end tables.
+CONVERTED_KEY = ("stock_ticker", "date", "currency")
+CONVERTED_UPDATE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+UPSERT_CHUNK_SIZE = 1000
+CONVERTED_TICKER_CHUNK_SIZE = 500
+# Note: A loaded FX cache checks for rates written by other processes at most this often, re-reading rows
+# updated within the overlap to catch late commits, and is reloaded whole once it reaches the max age.
+FX_CACHE_CHECK_SECONDS = float(os.getenv("FX_CACHE_CHECK_SECONDS", "1"))
+FX_CACHE_MAX_AGE_SECONDS = float(os.getenv("FX_CACHE_MAX_AGE_SECONDS", "600"))
+FX_CACHE_OVERLAP = timedelta(minutes=5)
+
+
+def get_converted_currencies() -> List[str]:
+    # Currencies kept in stock_prices_converted; an empty CONVERTED_CURRENCIES disables the table.
+    value = os.getenv("CONVERTED_CURRENCIES", "USD,EUR,ILS")
+    return [currency.strip().upper() for currency in value.split(",") if currency.strip()]
+
+
+def _watermark_sub_keys(table_end: str, frame: pd.DataFrame) -> pd.Series:
+    if table_end == "stock_records":
+        return frame["stock_ticker"]
+    return frame["base_currency"] + "/" + frame["target_currency"]
+
+
+def _rate_rows(frame: pd.DataFrame) -> Iterable[tuple]:
+    return frame[["base_currency", "target_currency", "date", "rate"]].itertuples(index=False, name=None)
+
+
+def _backfill_watermarks(session: Session) -> None:
+    # Seeds source_watermarks from existing records the first time the table is created.
+    if session.execute(select(SourceWatermarkModel.id).limit(1)).first() is not None:
+        return
+    now = datetime.now()
+    rows = []
+    for table_end, model in TABLE_MODELS.items():
+        if table_end == "stock_records":
+            sub_key = model.stock_ticker
+        else:
+            sub_key = model.base_currency + "/" + model.target_currency
+        for key in (sub_key, None):
+            group_by = [model.source_id] + ([key] if key is not None else [])
+            stmt = select(*group_by, func.max(model.date), func.count()).group_by(*group_by)
+            for result in session.execute(stmt):
+                rows.append({"source_id": result[0], "sub_key": result[1] if key is not None else "",
+                             "last_date": result[-2], "rows_written": result[-1], "updated_at": now})
+    if rows:
+        session.execute(insert(SourceWatermarkModel), rows)
+
+
+def upgrade_schema(engine: Engine) -> None:
+    """
+    Brings databases created before the natural-key constraints up to date.
+    Duplicate rows are removed (the most recently inserted one is kept) before the
+    unique index is created, and any missing column or lookup index is added.
+    """
+    inspector = inspect(engine)
+    with Session(engine) as session:
+        for table_name, model in TABLE_MODELS.items():
+            table = model.__table__
+            if not inspector.has_table(table_name):
+                continue
+            if WRITE_TIMESTAMP_COLUMN not in {c["name"] for c in inspector.get_columns(table_name)}:
+                session.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {WRITE_TIMESTAMP_COLUMN} TIMESTAMP"))
+            key_columns = list(NATURAL_KEYS[table_name])
+            unique_column_sets = [c["column_names"] for c in inspector.get_unique_constraints(table_name)]
+            unique_column_sets += [i["column_names"] for i in inspector.get_indexes(table_name) if i["unique"]]
+            if not any(sorted(columns) == sorted(key_columns) for columns in unique_column_sets):
+                keep_ids = select(func.max(table.c.id)).group_by(*[table.c[k] for k in key_columns])
+                session.execute(table.delete().where(table.c.id.not_in(keep_ids)))
+                session.execute(text(
+                    f"CREATE UNIQUE INDEX uq_{table_name}_natural_key ON {table_name} ({', '.join(key_columns)})"
+                ))
+            for index in table.indexes:
+                index.create(session.connection(), checkfirst=True)
+        _backfill_watermarks(session)
+        session.commit()
+
+
+DEFAULT_SOURCE_TYPE_END_TABLES = {
+    "polygon": "stock_records",
+    "polygon_grouped": "stock_records",
+    "frankfurter": "exchange_rate_records"
+}
+
+# Note: Process-wide state keyed by DB URL, so every DbBase instance shares one pool and one bootstrap.
+_engines: Dict[str, Engine] = {}
+_bootstrapped_urls: Set[str] = set()
+_source_type_end_tables: Dict[str, Dict[str, str]] = {}
+_fx_caches: Dict[str, FxRateCache] = {}
+# Note: Per DB URL, the max id and updated_at of exchange_rate_records the FX cache was last synced to.
+_fx_cache_marks: Dict[str, dict] = {}
+# Note: SQLite has a single writer, so writes through one SQLite engine take turns on its lock.
+_sqlite_write_locks: Dict[Engine, threading.RLock] = {}
+_registry_lock = threading.Lock()
+
+
+def _engine_options(db_url: str) -> dict:
+    options = {"pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"}
+    url = make_url(db_url)
+    # Note: In-memory SQLite uses a singleton pool that has no overflow setting.
+    if url.get_backend_name() != "sqlite" or url.database not in (None, "", ":memory:"):
+        options["pool_size"] = int(os.getenv("DB_POOL_SIZE", "5"))
+        options["max_overflow"] = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    return options
+
+
+def get_engine(db_url: Optional[str] = None) -> Engine:
+    # Returns the shared engine for the URL, creating its connection pool on first use.
+    db_url = db_url or os.getenv("DB_URL")
+    with _registry_lock:
+        engine = _engines.get(db_url)
+        if engine is None:
+            engine = create_engine(db_url, **_engine_options(db_url))
+            instrument_engine(engine)
+            if engine.dialect.name == "sqlite":
+                _sqlite_write_locks[engine] = threading.RLock()
+            _engines[db_url] = engine
+    return engine
+
+
+def init_db(db_url: Optional[str] = None) -> Engine:
+    """
+    Creates missing tables, upgrades older schemas and seeds the source type mapping.
+    Runs at most once per process and URL unless called explicitly again.
+    """
+    engine = get_engine(db_url)
+    db_url = engine.url.render_as_string(hide_password=False)
+    with _registry_lock:
+        Base.metadata.create_all(engine)
+        upgrade_schema(engine)
+        with Session(engine) as session:
+            _seed_source_type_end_table(session)
+            _source_type_end_tables[db_url] = _load_source_type_end_table(session)
+        _bootstrapped_urls.add(db_url)
+    return engine
+
+
+def _seed_source_type_end_table(session: Session) -> None:
+    # Create mapping entries only if not already present.
+    for src_type, end_table in DEFAULT_SOURCE_TYPE_END_TABLES.items():
+        stmt = select(SourceTypeEndTable).where(SourceTypeEndTable.source_type == src_type)
+        result = session.execute(stmt).scalars().first()
+        if not result:
+            new_mapping = SourceTypeEndTable(source_type=src_type, end_table=end_table)
+            session.add(new_mapping)
+    session.commit()
+
+
+def _load_source_type_end_table(session: Session) -> Dict[str, str]:
+    rows = session.execute(select(SourceTypeEndTable.source_type, SourceTypeEndTable.end_table))
+    return {source_type: end_table for source_type, end_table in rows}
 
 
 class DbBase(abc.ABC):
     def __init__(self):
-        db_url = os.getenv("DB_URL")
-        self.engine = create_engine(db_url)
-        Base.metadata.create_all(self.engine)
-        # Note: Initialize the mapping between source types and target tables.
-        self.__init_source_type_end_table()
+        self.engine = get_engine()
+        # Note: Set DB_AUTO_INIT=false when the schema is managed through an explicit init_db run.
+        auto_init = os.getenv("DB_AUTO_INIT", "true").lower() == "true"
+        if auto_init and self._db_url not in _bootstrapped_urls:
+            init_db(self._db_url)
+
+    @property
+    def _db_url(self) -> str:
+        return self.engine.url.render_as_string(hide_password=False)
 
     def get_db_session(self) -> Session:
         return Session(self.engine)
 
-    def __init_source_type_end_table(self):
-        session = self.get_db_session()
-        table_mapping = {
-            "polygon": "stock_records",
-            "frankfurter": "exchange_rate_records"
-        }
-        # Create mapping entries only if not already present.
-        for src_type, end_table in table_mapping.items():
-            stmt = select(SourceTypeEndTable).where(SourceTypeEndTable.source_type == src_type)
-            result = session.execute(stmt).scalars().first()
-            if not result:
-                new_mapping = SourceTypeEndTable(source_type=src_type, end_table=end_table)
-                session.add(new_mapping)
-        session.commit()
+    @contextmanager
+    def get_write_session(self) -> Iterator[Session]:
+        """
+        Session for transactions that write. On SQLite a transaction that read before writing fails at once
+        with "database is locked" while another connection writes, so concurrent writers are serialized.
+        """
+        lock = _sqlite_write_locks.get(self.engine)
+        with lock if lock is not None else nullcontext(), self.get_db_session() as session:
+            yield session
+
+    def get_default_end_table(self, source_type: str) -> Optional[str]:
+        # Served from the in-memory mapping; loaded once when the schema was not bootstrapped here.
+        mapping = _source_type_end_tables.get(self._db_url)
+        if mapping is None:
+            with self.get_db_session() as session:
+                mapping = _load_source_type_end_table(session)
+            _source_type_end_tables[self._db_url] = mapping
+        return mapping.get(source_type)
 
 
 class DbSettings(DbBase):
@@ -102,8 +348,13 @@ class DbSettings(DbBase):
             }
             return SourceConfig(**config_dict)
 
-    def add_source(self, source_config: SourceConfig) -> None:
+    def get_source_ids(self) -> List[int]:
         with self.get_db_session() as session:
+            stmt = select(SourceConfigModel.source_id).order_by(SourceConfigModel.source_id)
+            return list(session.execute(stmt).scalars())
+
+    def add_source(self, source_config: SourceConfig) -> None:
+        with self.get_write_session() as session:
             stmt = select(SourceConfigModel).where(
                 SourceConfigModel.source_id == source_config.source_id
             )
@@ -114,13 +365,9 @@ class DbSettings(DbBase):
             end_table_value = source_config.end_table
             if not end_table_value:
                 # Note: Lookup default target table based on source type.
-                lookup_stmt = select(SourceTypeEndTable).where(
-                    SourceTypeEndTable.source_type == source_config.source_type
-                )
-                lookup = session.execute(lookup_stmt).scalars().first()
-                if not lookup:
+                end_table_value = self.get_default_end_table(source_config.source_type)
+                if not end_table_value:
                     raise ValueError(f"No default end_table found for source type: {source_config.source_type}")
-                end_table_value = lookup.end_table
 
             new_config = SourceConfigModel(
                 source_id=source_config.source_id,
@@ -137,85 +384,494 @@ class DbSettings(DbBase):
 
 class DbData(DbBase):
     def write_data(self, data: List[StockRecord] | List[ExchangeRateRecord], table_end="stock_records") -> dict:
-        with self.get_db_session() as session:
-            inserted = 0
-            modified = 0
-            failed = 0
-            # Iterate records and update or insert based on existence.
-            for record in data:
-                try:
-                    if table_end == "stock_records" and isinstance(record, StockRecord):
-                        existing = session.query(StockRecordModel).filter_by(
-                            source_id=record.source_id,
-                            date=record.date,
-                            stock_ticker=record.stock_ticker
-                        ).first()
-                        if existing:
-                            existing.open = record.open
-                            existing.high = record.high
-                            existing.low = record.low
-                            existing.close = record.close
-                            existing.volume = record.volume
-                            modified += 1
-                        else:
-                            # Remove the id field to let the database autogenerate it.
-                            data_dict = record.__dict__
-                            data_dict.pop("id", None)
-                            new_fact = StockRecordModel(**data_dict)
-                            session.add(new_fact)
-                            inserted += 1
-
-                    elif table_end == "exchange_rate_records" and isinstance(record, ExchangeRateRecord):
-                        existing = session.query(ExchangeRateRecordModel).filter_by(
-                            source_id=record.source_id,
-                            date=record.date,
-                            base_currency=record.base_currency,
-                            target_currency=record.target_currency
-                        ).first()
-                        if existing:
-                            existing.rate = record.rate
-                            modified += 1
-                        else:
-                            data_dict = record.__dict__
-                            data_dict.pop("id", None)
-                            new_rate = ExchangeRateRecordModel(**data_dict)
-                            session.add(new_rate)
-                            inserted += 1
-                    else:
-                        raise ValueError(f"Unknown table_end: {table_end}")
-                except Exception as e:
-                    failed += 1
+        model = TABLE_MODELS.get(table_end)
+        if model is None:
+            # Note: Unknown tables fail every record, matching the previous per-row behaviour.
+            return {"inserted": 0, "modified": 0, "unchanged": 0, "failed": len(data)}
+
+        rows, failed = self._records_to_rows(data, table_end)
+        key_columns = NATURAL_KEYS[table_end]
+        # Note: The last occurrence of a natural key in the batch wins, as it did row by row.
+        unique_rows = list({tuple(row[c] for c in key_columns): row for row in rows}.values())
+
+        inserted = unchanged = 0
+        written = []
+        now = datetime.now()
+        fx_cache = self._fx_cache_for_write()
+        with self.get_write_session() as session:
+            for start in range(0, len(unique_rows), UPSERT_CHUNK_SIZE):
+                chunk = unique_rows[start:start + UPSERT_CHUNK_SIZE]
+                frame = pd.DataFrame(chunk)
+                frame["date"] = pd.to_datetime(frame["date"]).astype("datetime64[ns]")
+                stored, same = self._compare_existing(session, model, table_end, frame)
+                changed = [dict(row, updated_at=now) for row, skip in zip(chunk, same) if not skip]
+                if changed:
+                    self._upsert_rows(session, model, table_end, changed)
+                inserted += int((~stored).sum())
+                unchanged += int(same.sum())
+                written.extend(changed)
+            written = pd.DataFrame(written)
+            if not written.empty:
+                self._advance_watermarks(session, table_end, written)
+                self._refresh_converted_for(session, table_end, written, fx_cache)
+            with stage("db_commit"):
+                session.commit()
+        if not written.empty:
+            self._after_write(table_end, written)
+        # Note: Superseded copies of a key within the batch are never written, so they count as unchanged.
+        duplicates = len(rows) - len(unique_rows)
+        return {"inserted": inserted, "modified": len(unique_rows) - inserted - unchanged,
+                "unchanged": unchanged + duplicates, "failed": failed}
+
+    def _after_write(self, table_end: str, frame: pd.DataFrame) -> None:
+        # Note: Keeps a loaded FX cache current without reloading it, once the batch is committed.
+        if table_end == "exchange_rate_records" and self._db_url in _fx_caches:
+            _fx_caches[self._db_url].update(_rate_rows(frame))
+
+    def _fx_cache_for_write(self) -> Optional[FxRateCache]:
+        # Note: Loaded before the write session opens; on SQLite a second connection would wait on its lock.
+        return self.get_fx_cache() if get_converted_currencies() else None
+
+    def _refresh_converted_for(self, session: Session, table_end: str, frame: pd.DataFrame,
+                               fx_cache: Optional[FxRateCache]) -> None:
+        # Runs inside the write batch's transaction, so rows never commit without their converted prices.
+        currencies = get_converted_currencies()
+        if not currencies or fx_cache is None:
+            return
+        dates = pd.to_datetime(frame["date"])
+        date_from, date_to = dates.min().to_pydatetime(), dates.max().to_pydatetime()
+        touched = None
+        if table_end == "stock_records":
+            tickers = frame["stock_ticker"].unique().tolist()
+        else:
+            # Note: The batch's rates are not committed yet, so they only go into a copy of the cache.
+            fx_cache = fx_cache.merged(_rate_rows(frame))
+            tickers = self._converted_tickers(session, date_from, date_to)
+            touched = pd.concat([
+                frame[["date", column]].rename(columns={column: "currency"})
+                for column in ("base_currency", "target_currency")
+            ]).astype({"date": "datetime64[ns]"}).drop_duplicates()
+        for start in range(0, len(tickers), CONVERTED_TICKER_CHUNK_SIZE):
+            self._upsert_converted(session, tickers[start:start + CONVERTED_TICKER_CHUNK_SIZE], date_from, date_to,
+                                   currencies, fx_cache, touched)
+
+    @staticmethod
+    def _records_to_rows(data, table_end: str) -> Tuple[List[dict], int]:
+        # Converts records to plain column dicts, counting the ones that cannot be written.
+        record_type = RECORD_TYPES[table_end]
+        columns = [c.name for c in TABLE_MODELS[table_end].__table__.columns
+                   if c.name not in ("id", WRITE_TIMESTAMP_COLUMN)]
+        required = [c.name for c in TABLE_MODELS[table_end].__table__.columns
+                    if c.name != "id" and not c.nullable]
+        rows = []
+        failed = 0
+        for record in data:
+            try:
+                if not isinstance(record, record_type):
+                    raise ValueError(f"Unexpected record type for {table_end}: {type(record).__name__}")
+                row = {column: getattr(record, column) for column in columns}
+                if any(row[column] is None for column in required):
+                    raise ValueError(f"Missing required value in record: {row}")
+                # Note: pandas Timestamps are unwrapped so natural keys hash like DB datetimes.
+                if hasattr(row["date"], "to_pydatetime"):
+                    row["date"] = row["date"].to_pydatetime()
+                rows.append(row)
+            except Exception:
+                failed += 1
+        return rows, failed
+
+    @staticmethod
+    def _compare_existing(session: Session, model, table_end: str, frame: pd.DataFrame) -> Tuple[pd.Series, pd.Series]:
+        """
+        Returns two masks over the frame's rows: keys already stored, and stored rows whose values
+        are identical to the new ones. One range query per batch instead of one lookup per row.
+        """
+        key_columns = list(NATURAL_KEYS[table_end])
+        update_columns = list(UPDATE_COLUMNS[table_end])
+        stmt = (
+            select(*[getattr(model, c) for c in key_columns + update_columns])
+            .where(model.source_id.in_([int(s) for s in frame["source_id"].unique()]))
+            .where(model.date.between(frame["date"].min().to_pydatetime(), frame["date"].max().to_pydatetime()))
+        )
+        found = pd.DataFrame(session.execute(stmt).all(), columns=key_columns + update_columns)
+        if found.empty:
+            nothing = pd.Series(False, index=frame.index)
+            return nothing, nothing
+        found["date"] = pd.to_datetime(found["date"]).astype("datetime64[ns]")
+        found = found.astype({c: frame[c].dtype for c in key_columns if c != "date"})
+        merged = frame[key_columns + update_columns].merge(
+            found, on=key_columns, how="left", suffixes=("", "_stored"), indicator=True
+        )
+        stored = (merged["_merge"] == "both").to_numpy()
+        same = stored.copy()
+        for column in update_columns:
+            new = pd.to_numeric(merged[column], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+            old = pd.to_numeric(merged[f"{column}_stored"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+            # Note: Both-missing values count as equal, so a null volume does not force a rewrite.
+            same &= (new == old) | (np.isnan(new) & np.isnan(old))
+        return pd.Series(stored, index=frame.index), pd.Series(same, index=frame.index)
+
+    def _upsert_rows(self, session: Session, model, table_end: str, rows: List[dict]) -> None:
+        table = model.__table__
+        key_columns = NATURAL_KEYS[table_end]
+        update_columns = UPDATE_COLUMNS[table_end] + (WRITE_TIMESTAMP_COLUMN,)
+        dialect = session.get_bind().dialect.name
+        if dialect == "postgresql":
+            stmt = pg_insert(table)
+        elif dialect == "sqlite":
+            stmt = sqlite_insert(table)
+        else:
+            self._staged_merge(session, table, key_columns, update_columns, rows)
+            return
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={column: stmt.excluded[column] for column in update_columns},
+        )
+        session.execute(stmt, rows)
+
+    @staticmethod
+    def _staged_merge(session: Session, table: Table, key_columns, update_columns, rows: List[dict]) -> None:
+        # Fallback for dialects without ON CONFLICT: load a temp table, then update and insert set-based.
+        staging = Table(
+            f"staging_{table.name}",
+            MetaData(),
+            *[Column(c.name, c.type) for c in table.columns if c.name != "id"],
+            prefixes=["TEMPORARY"],
+        )
+        connection = session.connection()
+        staging.create(connection, checkfirst=True)
+        session.execute(staging.delete())
+        session.execute(staging.insert(), rows)
+
+        match = and_(*[table.c[k] == staging.c[k] for k in key_columns])
+        session.execute(
+            table.update()
+            .where(exists().where(match))
+            .values({c: select(staging.c[c]).where(match).scalar_subquery() for c in update_columns})
+        )
+        columns = [c.name for c in staging.columns]
+        session.execute(
+            table.insert().from_select(
+                columns,
+                select(*[staging.c[c] for c in columns]).where(~exists().where(match)),
+            )
+        )
+        session.execute(staging.delete())
+
+    def write_frame(self, frame: pd.DataFrame, table_end="stock_records") -> dict:
+        """
+        Columnar counterpart of write_data: upserts a DataFrame holding the end table's columns
+        through the driver's bulk path (COPY on PostgreSQL, executemany on SQLite) without building
+        per-row Python objects. Returns the same inserted/modified/unchanged/failed stats.
+        """
+        model = TABLE_MODELS.get(table_end)
+        if model is None:
+            return {"inserted": 0, "modified": 0, "unchanged": 0, "failed": len(frame)}
+        table = model.__table__
+        columns = [c.name for c in table.columns if c.name != "id"]
+        required = [c.name for c in table.columns if c.name != "id" and not c.nullable]
+        key_columns = list(NATURAL_KEYS[table_end])
+
+        frame = frame.reindex(columns=columns)
+        valid = frame[required].notna().all(axis=1)
+        failed = int((~valid).sum())
+        frame = frame[valid].copy()
+        frame["date"] = pd.to_datetime(frame["date"]).astype("datetime64[ns]")
+        for column in table.columns:
+            if column.name in frame and isinstance(column.type, Integer):
+                frame[column.name] = frame[column.name].astype("int64")
+        total = len(frame)
+        # Note: The last occurrence of a natural key in the batch wins, as in write_data.
+        frame = frame.drop_duplicates(key_columns, keep="last")
+        if frame.empty:
+            return {"inserted": 0, "modified": 0, "unchanged": 0, "failed": failed}
+
+        fx_cache = self._fx_cache_for_write()
+        with self.get_write_session() as session:
+            stored, same = self._compare_existing(session, model, table_end, frame)
+            # Note: Rows identical to the stored ones are not rewritten, keeping overlap re-scrapes out of the WAL.
+            changed = frame[~same].assign(updated_at=pd.Timestamp.now())
+            if not changed.empty:
+                self._upsert_frame(session, table, changed, key_columns,
+                                   UPDATE_COLUMNS[table_end] + (WRITE_TIMESTAMP_COLUMN,))
+                self._advance_watermarks(session, table_end, changed)
+                self._refresh_converted_for(session, table_end, changed, fx_cache)
+            with stage("db_commit"):
+                session.commit()
+        if not changed.empty:
+            self._after_write(table_end, changed)
+        inserted = int((~stored).sum())
+        unchanged = int(same.sum())
+        # Note: Superseded copies of a key within the batch are never written, so they count as unchanged.
+        return {"inserted": inserted, "modified": len(frame) - inserted - unchanged,
+                "unchanged": unchanged + total - len(frame), "failed": failed}
+
+    def _upsert_frame(self, session: Session, table: Table, frame: pd.DataFrame, key_columns,
+                      update_columns) -> None:
+        # Upserts the frame through the driver's bulk path: executemany on SQLite, COPY on PostgreSQL.
+        dialect = session.get_bind().dialect.name
+        sql = partial(self._upsert_sql, table.name, frame.columns, key_columns, update_columns)
+        if dialect == "sqlite":
+            self._executemany(session, sql(f"VALUES ({', '.join('?' for _ in frame.columns)})"), frame)
+        elif dialect == "postgresql":
+            self._copy_upsert(session, table.name, frame, sql)
+        else:
+            self._staged_merge(session, table, key_columns, update_columns, frame.to_dict(orient="records"))
+
+    @staticmethod
+    def _upsert_sql(table_name: str, columns, key_columns, update_columns, source: str) -> str:
+        updates = ", ".join(f"{c} = excluded.{c}" for c in update_columns)
+        return (f"INSERT INTO {table_name} ({', '.join(columns)}) {source} "
+                f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {updates}")
+
+    @staticmethod
+    def _executemany(session: Session, sql: str, frame: pd.DataFrame) -> None:
+        # Note: Dates use SQLAlchemy's SQLite storage format so natural keys match ORM-written rows.
+        values = [
+            frame[c].dt.strftime("%Y-%m-%d %H:%M:%S.%f").tolist()
+            if pd.api.types.is_datetime64_any_dtype(frame[c]) else frame[c].tolist()
+            for c in frame.columns
+        ]
+        cursor = session.connection().connection.dbapi_connection.cursor()
+        # Note: Raw DBAPI calls bypass the engine's event hooks, so their time is recorded explicitly.
+        try:
+            with stage("db_write"):
+                cursor.executemany(sql, list(zip(*values)))
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _copy_upsert(session: Session, table_name: str, frame: pd.DataFrame, sql: Callable[[str], str]) -> None:
+        # COPYs the frame into a temporary staging table, then merges it with one INSERT ... SELECT.
+        columns = ", ".join(frame.columns)
+        staging = f"staging_{table_name}"
+        buffer = io.StringIO()
+        frame.to_csv(buffer, index=False, header=False, date_format="%Y-%m-%d %H:%M:%S.%f")
+        buffer.seek(0)
+        cursor = session.connection().connection.dbapi_connection.cursor()
+        try:
+            with stage("db_write"):
+                cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS {staging} AS "
+                               f"SELECT {columns} FROM {table_name} WITH NO DATA")
+                cursor.execute(f"TRUNCATE {staging}")
+                copy_sql = f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)"
+                if hasattr(cursor, "copy_expert"):
+                    cursor.copy_expert(copy_sql, buffer)
+                else:
+                    with cursor.copy(copy_sql) as copy:
+                        copy.write(buffer.getvalue())
+                cursor.execute(sql(f"SELECT {columns} FROM {staging}"))
+                cursor.execute(f"TRUNCATE {staging}")
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _advance_watermarks(session: Session, table_end: str, frame: pd.DataFrame) -> None:
+        # Runs inside the write batch's transaction, so watermarks never run ahead of committed rows.
+        frame = frame.assign(sub_key=_watermark_sub_keys(table_end, frame),
+                             date=pd.to_datetime(frame["date"]))
+        per_key = frame.groupby(["source_id", "sub_key"])["date"].agg(["max", "size"]).reset_index()
+        per_source = frame.groupby("source_id")["date"].agg(["max", "size"]).reset_index().assign(sub_key="")
+        batch = pd.concat([per_key, per_source], ignore_index=True)
+
+        source_ids = [int(source_id) for source_id in batch["source_id"].unique()]
+        stmt = select(SourceWatermarkModel).where(SourceWatermarkModel.source_id.in_(source_ids))
+        existing = {(w.source_id, w.sub_key): w for w in session.execute(stmt).scalars()}
+        now = datetime.now()
+        inserts, updates = [], []
+        for source_id, sub_key, last_date, size in batch[["source_id", "sub_key", "max", "size"]].itertuples(
+                index=False, name=None):
+            last_date = last_date.to_pydatetime()
+            current = existing.get((int(source_id), sub_key))
+            if current is None:
+                inserts.append({"source_id": int(source_id), "sub_key": sub_key, "last_date": last_date,
+                                "rows_written": int(size), "updated_at": now})
+            else:
+                updates.append({"id": current.id, "updated_at": now,
+                                "last_date": max(current.last_date, last_date) if current.last_date else last_date,
+                                "rows_written": (current.rows_written or 0) + int(size)})
+        if inserts:
+            session.execute(insert(SourceWatermarkModel), inserts)
+        if updates:
+            session.execute(update(SourceWatermarkModel), updates)
+
+    def mark_source_run(self, source_id: int, status: str) -> None:
+        # Records the outcome of a source run on its source-level watermark.
+        with self.get_write_session() as session:
+            watermark = session.execute(
+                select(SourceWatermarkModel)
+                .where(SourceWatermarkModel.source_id == source_id)
+                .where(SourceWatermarkModel.sub_key == "")
+            ).scalars().first()
+            if watermark is None:
+                watermark = SourceWatermarkModel(source_id=source_id, sub_key="", rows_written=0)
+                session.add(watermark)
+            watermark.last_run_status = status
+            watermark.last_run_at = datetime.now()
             session.commit()
-        return {"inserted": inserted, "modified": modified, "failed": failed}
 
-    def get_data_since(self, source_id: int, end_table: str):
+    def get_watermarks(self, source_id: int) -> Dict[str, datetime]:
+        # Last ingested date per sub-key (ticker or "BASE/TARGET"); "" is the whole source.
         with self.get_db_session() as session:
-            table_mapping = {
-                "stock_records": StockRecordModel,
-                "exchange_rate_records": ExchangeRateRecordModel,
-            }
-            model = table_mapping.get(end_table)
-            if model is None:
-                raise ValueError(f"Unknown end_table: {end_table}")
+            stmt = select(SourceWatermarkModel.sub_key, SourceWatermarkModel.last_date).where(
+                SourceWatermarkModel.source_id == source_id)
+            return {sub_key: last_date for sub_key, last_date in session.execute(stmt)}
 
+    def get_source_freshness(self) -> pd.DataFrame:
+        # Fleet-wide freshness in one query: every source with its watermark and last run outcome.
+        with self.get_db_session() as session:
             stmt = (
-                select(model)
-                .where(model.source_id == source_id)
-                .order_by(model.date.desc())
-                .limit(1)
+                select(SourceConfigModel.source_id, SourceConfigModel.source_type,
+                       SourceConfigModel.url_additional, SourceWatermarkModel.last_date,
+                       SourceWatermarkModel.rows_written, SourceWatermarkModel.last_run_status,
+                       SourceWatermarkModel.last_run_at)
+                .outerjoin(SourceWatermarkModel,
+                           (SourceWatermarkModel.source_id == SourceConfigModel.source_id)
+                           & (SourceWatermarkModel.sub_key == ""))
+                .order_by(SourceConfigModel.source_id)
             )
-            result = session.execute(stmt).scalars().first()
-            if result:
-                return result.date
-        return None
+            return pd.DataFrame(session.execute(stmt).all(),
+                                columns=["source_id", "source_type", "url_additional", "last_date",
+                                         "rows_written", "last_run_status", "last_run_at"])
+
+    def refresh_converted_prices(self, tickers: Optional[List[str]] = None, date_from: Optional[datetime] = None,
+                                 date_to: Optional[datetime] = None) -> int:
+        """
+        Recomputes stock_prices_converted for the given tickers (all when None) and date range
+        (unbounded when None), converting with the FX cache at the exact date. Returns rows written.
+        """
+        currencies = get_converted_currencies()
+        if not currencies:
+            return 0
+        if tickers is None:
+            with self.get_db_session() as session:
+                tickers = self._converted_tickers(session, date_from, date_to)
+        fx_cache = self.get_fx_cache()
+        written = 0
+        for start in range(0, len(tickers), CONVERTED_TICKER_CHUNK_SIZE):
+            with self.get_write_session() as session:
+                written += self._upsert_converted(session, tickers[start:start + CONVERTED_TICKER_CHUNK_SIZE],
+                                                  date_from, date_to, currencies, fx_cache)
+                with stage("db_commit"):
+                    session.commit()
+        return written
+
+    def _converted_tickers(self, session: Session, date_from: Optional[datetime],
+                           date_to: Optional[datetime]) -> List[str]:
+        stmt = select(StockRecordModel.stock_ticker).distinct()
+        stmt = self._date_bounded(stmt, StockRecordModel.date, date_from, date_to)
+        return list(session.execute(stmt).scalars())
+
+    def _upsert_converted(self, session: Session, tickers: List[str], date_from: Optional[datetime],
+                          date_to: Optional[datetime], currencies: List[str], fx_cache: FxRateCache,
+                          touched: Optional[pd.DataFrame] = None) -> int:
+        """
+        Upserts the converted prices of the tickers within the date range. With touched, the (date, currency)
+        pairs of rewritten exchange rates, only the conversions those rates can change are written.
+        """
+        columns = ["stock_ticker", "date", "open", "high", "low", "close", "volume", "base_currency"]
+        stmt = select(*[getattr(StockRecordModel, c) for c in columns], StockRecordModel.id).where(
+            StockRecordModel.stock_ticker.in_(tickers))
+        stmt = self._date_bounded(stmt, StockRecordModel.date, date_from, date_to)
+        if touched is not None:
+            stmt = stmt.where(StockRecordModel.date.in_(
+                [date.to_pydatetime() for date in touched["date"].drop_duplicates()]))
+        stocks = pd.DataFrame(session.execute(stmt).all(), columns=columns + ["id"])
+        # Note: When several sources hold the same ticker and date, the most recently written row wins.
+        stocks = stocks.sort_values("id").drop_duplicates(["stock_ticker", "date"], keep="last")
+        converted = self._convert_prices(stocks, currencies, fx_cache)
+        if touched is not None and not converted.empty:
+            converted = self._touched_conversions(converted, stocks, touched)
+        if not converted.empty:
+            # Note: Upserting in key order lets concurrent writers of the same keys wait on each other
+            # instead of failing on uq_stock_prices_converted_key or deadlocking.
+            converted = converted.sort_values(list(CONVERTED_KEY))
+            self._upsert_frame(session, StockPriceConvertedModel.__table__, converted, CONVERTED_KEY,
+                               CONVERTED_UPDATE_COLUMNS)
+        return len(converted)
+
+    @staticmethod
+    def _touched_conversions(converted: pd.DataFrame, stocks: pd.DataFrame, touched: pd.DataFrame) -> pd.DataFrame:
+        # Note: Every direct, inverse or pivot path between two currencies uses a pair holding one of them,
+        # so a conversion can only change where a rewritten rate on its date touches its base or target.
+        bases = stocks[["stock_ticker", "date", "base_currency"]].astype({"date": "datetime64[ns]"})
+        frame = converted.merge(bases, on=["stock_ticker", "date"], how="left")
+        keys = touched.assign(touched=True)
+        by_target = frame.merge(keys, on=["date", "currency"], how="left")["touched"].notna()
+        by_base = frame.merge(keys.rename(columns={"currency": "base_currency"}), on=["date", "base_currency"],
+                              how="left")["touched"].notna()
+        return converted[(by_target | by_base).to_numpy()]
+
+    def rebuild_converted_prices(self) -> int:
+        # Full rebuild, e.g. after a backfill or a change of CONVERTED_CURRENCIES.
+        with self.get_write_session() as session:
+            session.execute(StockPriceConvertedModel.__table__.delete())
+            session.commit()
+        return self.refresh_converted_prices()
+
+    @staticmethod
+    def _date_bounded(stmt, column, date_from: Optional[datetime], date_to: Optional[datetime]):
+        if date_from is not None:
+            stmt = stmt.where(column >= date_from)
+        if date_to is not None:
+            stmt = stmt.where(column <= date_to)
+        return stmt
+
+    @staticmethod
+    def _convert_prices(stocks: pd.DataFrame, currencies: List[str], fx_cache: FxRateCache) -> pd.DataFrame:
+        frames = []
+        pairs = stocks[["base_currency", "date"]].drop_duplicates()
+        for currency in currencies:
+            rates = pairs.assign(rate=[fx_cache.get_rate(base, currency, date, max_age_days=0)
+                                       for base, date in pairs.itertuples(index=False, name=None)])
+            converted = stocks.merge(rates, on=["base_currency", "date"]).dropna(subset=["rate"])
+            for column in ("open", "high", "low", "close"):
+                converted[column] = converted[column] * converted["rate"]
+            frames.append(converted.assign(currency=currency))
+        if not frames:
+            return pd.DataFrame()
+        frame = pd.concat(frames, ignore_index=True)
+        frame["date"] = pd.to_datetime(frame["date"]).astype("datetime64[ns]")
+        return frame[["stock_ticker", "date", "currency", "open", "high", "low", "close", "volume"]]
+
+    def get_data_since(self, source_id: int, end_table: Optional[str] = None):
+        with self.get_db_session() as session:
+            # Note: The source-level watermark answers with a single unique-key lookup.
+            stmt = (
+                select(SourceWatermarkModel.last_date)
+                .where(SourceWatermarkModel.source_id == source_id)
+                .where(SourceWatermarkModel.sub_key == "")
+            )
+            last_date = session.execute(stmt).scalar_one_or_none()
+            if last_date is not None or end_table is None:
+                return last_date
+
+            # Fall back to the records for sources without a watermark yet.
+            model = TABLE_MODELS.get(end_table)
+            if model is None:
+                raise ValueError(f"Unknown end_table: {end_table}")
+            stmt = select(func.max(model.date)).where(model.source_id == source_id)
+            return session.execute(stmt).scalar_one_or_none()
 
     def get_stock_price(self, stock_name, date, out_put_currency):
         """
         Returns the stock price for a given stock and date in the desired currency.
-        First, looks for a stock record in the required currency.
-        If not found, performs a join with the exchange rate table to convert the price.
+        First, reads stock_prices_converted, then looks for a stock record in the required currency.
+        If not found, converts the price with the in-memory FX cache, which also resolves
+        inverse and cross rates.
         """
         with self.get_db_session() as session:
+            # Precomputed prices answer with one indexed lookup when present.
+            stmt = (
+                select(StockPriceConvertedModel.close)
+                .where(StockPriceConvertedModel.stock_ticker == stock_name)
+                .where(StockPriceConvertedModel.date == date)
+                .where(StockPriceConvertedModel.currency == out_put_currency)
+            )
+            close = session.execute(stmt).scalar_one_or_none()
+            if close is not None:
+                return close
+
             # Try same currency first.
             stmt = (
                 select(StockRecordModel)
@@ -228,23 +884,140 @@ class DbData(DbBase):
             if stock_record:
                 return stock_record.close
 
-            # Otherwise, perform a join to attempt conversion.
+            # Otherwise, convert any record of the stock on that date.
             stmt = (
-                select(StockRecordModel, ExchangeRateRecordModel)
-                .join(
-                    ExchangeRateRecordModel,
-                    (ExchangeRateRecordModel.base_currency == StockRecordModel.base_currency)
-                    & (ExchangeRateRecordModel.target_currency == out_put_currency)
-                    & (ExchangeRateRecordModel.date == date)
-                )
+                select(StockRecordModel)
                 .where(StockRecordModel.stock_ticker == stock_name)
                 .where(StockRecordModel.date == date)
                 .limit(1)
             )
-            row = session.execute(stmt).first()
-            if row:
-                stock_record, exchange_rate = row
-                return stock_record.close * exchange_rate.rate
+            stock_record = session.execute(stmt).scalar_one_or_none()
+            if stock_record:
+                # Note: max_age_days=0 keeps the exact-date rate match of the original join.
+                return self.get_fx_cache().convert(stock_record.close, stock_record.base_currency,
+                                                   out_put_currency, date, max_age_days=0)
 
             # None found.
             return None
+
+    def get_fx_cache(self) -> FxRateCache:
+        """
+        Loads every exchange rate once per process. Afterwards a cheap max(id) / max(updated_at) probe,
+        run at most every FX_CACHE_CHECK_SECONDS, merges rates written since by any process.
+        """
+        with _registry_lock:
+            cache = _fx_caches.get(self._db_url)
+            mark = _fx_cache_marks.get(self._db_url)
+            now = time.monotonic()
+            if cache is None or now - mark["loaded_at"] >= FX_CACHE_MAX_AGE_SECONDS:
+                cache = FxRateCache()
+                with self.get_db_session() as session:
+                    # Note: The mark is taken before the rates, so rows committed in between are read again later.
+                    latest = self._fx_table_mark(session)
+                    cache.load(session.execute(self._fx_rates_stmt()).tuples())
+                _fx_caches[self._db_url] = cache
+                _fx_cache_marks[self._db_url] = dict(latest, loaded_at=now, checked_at=now)
+            elif now - mark["checked_at"] >= FX_CACHE_CHECK_SECONDS:
+                with self.get_db_session() as session:
+                    latest = self._fx_table_mark(session)
+                    if (latest["max_id"], latest["max_updated_at"]) != (mark["max_id"], mark["max_updated_at"]):
+                        stmt = self._fx_rates_stmt().where(self._fx_rows_since(mark))
+                        cache.update(session.execute(stmt).tuples())
+                _fx_cache_marks[self._db_url] = dict(latest, loaded_at=mark["loaded_at"], checked_at=now)
+        return cache
+
+    @staticmethod
+    def _fx_rates_stmt():
+        return select(
+            ExchangeRateRecordModel.base_currency,
+            ExchangeRateRecordModel.target_currency,
+            ExchangeRateRecordModel.date,
+            ExchangeRateRecordModel.rate,
+        ).order_by(ExchangeRateRecordModel.id)
+
+    @staticmethod
+    def _fx_table_mark(session: Session) -> dict:
+        # Two index-backed aggregates: new rows raise max(id), rewritten rates raise max(updated_at).
+        max_id, max_updated_at = session.execute(
+            select(func.max(ExchangeRateRecordModel.id), func.max(ExchangeRateRecordModel.updated_at))
+        ).one()
+        return {"max_id": max_id, "max_updated_at": max_updated_at}
+
+    @staticmethod
+    def _fx_rows_since(mark: dict):
+        condition = ExchangeRateRecordModel.id > (mark["max_id"] or 0)
+        if mark["max_updated_at"] is not None:
+            condition = or_(condition, ExchangeRateRecordModel.updated_at >= mark["max_updated_at"] - FX_CACHE_OVERLAP)
+        return condition
+
+    def reload_fx_cache(self) -> FxRateCache:
+        # Drops the cached rates and loads them whole again.
+        with _registry_lock:
+            _fx_caches.pop(self._db_url, None)
+        return self.get_fx_cache()
+
+    def get_stock_prices(self, tickers: Iterable[str], date_from: datetime, date_to: datetime,
+                         currencies: Iterable[str]) -> pd.DataFrame:
+        """
+        Returns close prices for every ticker, calendar day in [date_from, date_to] and currency,
+        as columns stock_ticker, date, currency, close.
+        Prices and exchange rates are matched as-of: the latest row on or before each day is used,
+        so weekends and holidays carry the previous close. Unknown values are NaN.
+        """
+        tickers = sorted(set(tickers))
+        currencies = sorted(set(currencies))
+        with self.get_db_session() as session:
+            stocks = self._read_as_of_range(
+                session, StockRecordModel, lambda: StockRecordModel.stock_ticker.in_(tickers),
+                [StockRecordModel.stock_ticker], date_from, date_to,
+                [StockRecordModel.stock_ticker, StockRecordModel.date, StockRecordModel.close,
+                 StockRecordModel.base_currency],
+            )
+
+        days = pd.DataFrame({"date": pd.date_range(date_from, date_to, freq="D").astype("datetime64[ns]")})
+        grid = days.merge(pd.DataFrame({"stock_ticker": tickers}), how="cross")
+        prices = self._merge_as_of(grid, stocks, ["stock_ticker"])
+
+        # Note: Rates come from the FX cache, so inverse and cross rates resolve as in get_stock_price.
+        fx_cache = self.get_fx_cache()
+        frames = []
+        for currency in currencies:
+            rates = np.full(len(prices), np.nan)
+            for base_currency in prices["base_currency"].dropna().unique():
+                mask = (prices["base_currency"] == base_currency).to_numpy()
+                rates[mask] = fx_cache.get_rates(base_currency, currency, prices["date"].to_numpy()[mask])
+            converted = prices.assign(currency=currency, close=prices["close"].astype(float) * rates)
+            frames.append(converted[["stock_ticker", "date", "currency", "close"]])
+        if not frames:
+            return pd.DataFrame(columns=["stock_ticker", "date", "currency", "close"])
+        return pd.concat(frames, ignore_index=True).astype({"close": float}).sort_values(
+            ["stock_ticker", "date", "currency"], ignore_index=True)
+
+    @staticmethod
+    def _read_as_of_range(session: Session, model, key_filter: Callable, key_columns, date_from: datetime,
+                          date_to: datetime, columns) -> pd.DataFrame:
+        # Rows inside the range plus, per key, the latest row before it to seed the as-of match.
+        # key_filter builds a fresh clause per use, as expanding IN parameters cannot be shared in a UNION.
+        anchors = (
+            select(*key_columns, func.max(model.date).label("anchor_date"))
+            .where(key_filter())
+            .where(model.date < date_from)
+            .group_by(*key_columns)
+            .subquery()
+        )
+        anchor_match = and_(*[column == anchors.c[column.key] for column in key_columns],
+                            model.date == anchors.c.anchor_date)
+        in_range = select(*columns, model.id).where(key_filter()).where(model.date.between(date_from, date_to))
+        seeds = select(*columns, model.id).join(anchors, anchor_match)
+        rows = session.execute(in_range.union_all(seeds)).all()
+        frame = pd.DataFrame(rows, columns=[column.key for column in columns] + ["id"])
+        # Note: When several sources hold the same key and date, the most recently written row wins.
+        frame = frame.sort_values("id").drop_duplicates([c.key for c in key_columns] + ["date"], keep="last")
+        frame["date"] = pd.to_datetime(frame["date"]).astype("datetime64[ns]")
+        return frame.drop(columns="id")
+
+    @staticmethod
+    def _merge_as_of(left: pd.DataFrame, right: pd.DataFrame, by: List[str]) -> pd.DataFrame:
+        right = right.astype({column: left[column].dtype for column in by} | {"date": "datetime64[ns]"})
+        return pd.merge_asof(left.sort_values("date"), right.sort_values("date"), on="date", by=by,
+                             direction="backward")
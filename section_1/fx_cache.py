@@ -0,0 +1,172 @@
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Note: Cross rates are triangulated through these currencies when no direct or inverse pair exists.
+DEFAULT_PIVOTS = ("EUR", "USD")
+
+RateRow = Tuple[str, str, datetime, float]
+
+
+def _to_day(date: datetime) -> int:
+    return int(np.datetime64(date, "D").astype(np.int64))
+
+
+class FxRateCache:
+    """
+    In-memory exchange rates held as per-pair, date-sorted numpy arrays.
+    Answers direct, inverse and pivot-triangulated conversions without touching the database,
+    matching the latest rate on or before the requested date.
+    """
+
+    def __init__(self, pivots: Iterable[str] = DEFAULT_PIVOTS):
+        self.pivots = tuple(pivots)
+        self._pairs: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, rows: Iterable[RateRow]) -> None:
+        # Replaces the cache content with the given (base, target, date, rate) rows.
+        pairs = self._build_pairs(rows)
+        with self._lock:
+            self._pairs = pairs
+
+    def update(self, rows: Iterable[RateRow]) -> None:
+        # Merges newly written rows; a new rate for an existing pair and date replaces the cached one.
+        new_pairs = self._build_pairs(rows)
+        with self._lock:
+            pairs = dict(self._pairs)
+            for pair, (new_days, new_rates) in new_pairs.items():
+                if pair in pairs:
+                    days, rates = pairs[pair]
+                    new_days = np.concatenate([days, new_days])
+                    new_rates = np.concatenate([rates, new_rates])
+                pairs[pair] = self._sorted_unique(new_days, new_rates)
+            self._pairs = pairs
+
+    def merged(self, rows: Iterable[RateRow]) -> "FxRateCache":
+        # Copy that also holds the given rows, e.g. rates written but not committed yet; this cache is untouched.
+        cache = FxRateCache(self.pivots)
+        cache._pairs = self._pairs
+        cache.update(rows)
+        return cache
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._pairs = {}
+
+    @property
+    def pair_count(self) -> int:
+        return len(self._pairs)
+
+    def get_rate(self, base_currency: str, target_currency: str, date: datetime,
+                 max_age_days: Optional[int] = None) -> Optional[float]:
+        base_currency, target_currency = base_currency.upper(), target_currency.upper()
+        if base_currency == target_currency:
+            return 1.0
+        day = _to_day(date)
+        pairs = self._pairs
+        rate = self._pair_rate(pairs, base_currency, target_currency, day, max_age_days)
+        if rate is not None:
+            return rate
+        for pivot in self.pivots:
+            if pivot in (base_currency, target_currency):
+                continue
+            first = self._pair_rate(pairs, base_currency, pivot, day, max_age_days)
+            second = self._pair_rate(pairs, pivot, target_currency, day, max_age_days) if first else None
+            if first is not None and second is not None:
+                return first * second
+        return None
+
+    def get_rates(self, base_currency: str, target_currency: str, dates,
+                  max_age_days: Optional[int] = None) -> np.ndarray:
+        # Vectorized get_rate over many dates, resolved in the same order; NaN where no rate is known.
+        base_currency, target_currency = base_currency.upper(), target_currency.upper()
+        days = np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+        if base_currency == target_currency:
+            return np.ones(len(days))
+        pairs = self._pairs
+        rates = self._pair_rates(pairs, base_currency, target_currency, days, max_age_days)
+        for pivot in self.pivots:
+            missing = np.isnan(rates)
+            if not missing.any():
+                break
+            if pivot in (base_currency, target_currency):
+                continue
+            first = self._pair_rates(pairs, base_currency, pivot, days[missing], max_age_days)
+            second = self._pair_rates(pairs, pivot, target_currency, days[missing], max_age_days)
+            rates[missing] = first * second
+        return rates
+
+    def convert(self, amount: float, base_currency: str, target_currency: str, date: datetime,
+                max_age_days: Optional[int] = None) -> Optional[float]:
+        rate = self.get_rate(base_currency, target_currency, date, max_age_days)
+        return None if rate is None else amount * rate
+
+    @classmethod
+    def _pair_rate(cls, pairs, base_currency: str, target_currency: str, day: int,
+                   max_age_days: Optional[int]) -> Optional[float]:
+        rate = cls._lookup(pairs.get((base_currency, target_currency)), day, max_age_days)
+        if rate is not None:
+            return rate
+        inverse = cls._lookup(pairs.get((target_currency, base_currency)), day, max_age_days)
+        return 1.0 / inverse if inverse else None
+
+    @classmethod
+    def _pair_rates(cls, pairs, base_currency: str, target_currency: str, days: np.ndarray,
+                    max_age_days: Optional[int]) -> np.ndarray:
+        rates = cls._lookup_many(pairs.get((base_currency, target_currency)), days, max_age_days)
+        missing = np.isnan(rates)
+        if missing.any():
+            inverse = cls._lookup_many(pairs.get((target_currency, base_currency)), days[missing], max_age_days)
+            with np.errstate(divide="ignore"):
+                rates[missing] = np.where(inverse != 0, 1.0 / inverse, np.nan)
+        return rates
+
+    @staticmethod
+    def _lookup_many(series: Optional[Tuple[np.ndarray, np.ndarray]], days: np.ndarray,
+                     max_age_days: Optional[int]) -> np.ndarray:
+        rates = np.full(len(days), np.nan)
+        if series is None:
+            return rates
+        pair_days, pair_rates = series
+        index = np.searchsorted(pair_days, days, side="right") - 1
+        found = index >= 0
+        if max_age_days is not None:
+            found &= days - pair_days[np.maximum(index, 0)] <= max_age_days
+        rates[found] = pair_rates[index[found]]
+        return rates
+
+    @staticmethod
+    def _lookup(series: Optional[Tuple[np.ndarray, np.ndarray]], day: int,
+                max_age_days: Optional[int]) -> Optional[float]:
+        if series is None:
+            return None
+        days, rates = series
+        index = int(np.searchsorted(days, day, side="right")) - 1
+        if index < 0 or (max_age_days is not None and day - days[index] > max_age_days):
+            return None
+        return float(rates[index])
+
+    @classmethod
+    def _build_pairs(cls, rows: Iterable[RateRow]) -> Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]]:
+        frame = pd.DataFrame(list(rows), columns=["base_currency", "target_currency", "date", "rate"])
+        if frame.empty:
+            return {}
+        frame["day"] = pd.to_datetime(frame["date"]).values.astype("datetime64[D]").astype(np.int32)
+        pairs = {}
+        for (base_currency, target_currency), group in frame.groupby(["base_currency", "target_currency"],
+                                                                     sort=False):
+            pairs[(base_currency.upper(), target_currency.upper())] = cls._sorted_unique(
+                group["day"].to_numpy(np.int32), group["rate"].to_numpy(np.float64))
+        return pairs
+
+    @staticmethod
+    def _sorted_unique(days: np.ndarray, rates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Stable sort keeps input order for equal days, so the last row for a day wins.
+        order = np.argsort(days, kind="stable")
+        days, rates = days[order], rates[order]
+        keep = np.append(days[1:] != days[:-1], True)
+        return days[keep], rates[keep]
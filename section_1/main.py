@@ -1,9 +1,16 @@
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from typing import Iterable, Optional
 
 from section_1.collectors.base_data_collector import BaseDataCollector
 from section_1.collectors.collectors import collectors
-from section_1.database import DbSettings, DbData
+from section_1.collectors.response_cache import ResponseCacheMiss, get_response_cache
+from section_1.database import DbSettings, DbData, init_db
 from section_1.models import SourceConfig
+from section_1.parquet_export import ParquetExporter
 
 
 def create_source(source):
@@ -13,15 +20,74 @@ def create_source(source):
     db_settings.add_source(source_config)
 
 
-def preform_single_scrape(source_id: int):
+def preform_single_scrape(source_id: int, **collector_options):
     # Retrieve source configuration and invoke the appropriate data collector.
+    # collector_options are passed to the collector, e.g. cache_mode="replay" with a pinned run_until.
     db_settings = DbSettings()
     source_config: SourceConfig = db_settings.get_source_config(source_id)
-    collector: BaseDataCollector = collectors[source_config.source_type](source_config)
+    collector: BaseDataCollector = collectors[source_config.source_type](source_config, **collector_options)
     return collector.collect()
 
 
+def replay_options(source_id: int, run_until: Optional[datetime] = None) -> dict:
+    # Collector options that repeat a cached run's date range (its latest run, or the one ending at run_until).
+    run = get_response_cache().get_run(source_id, run_until)
+    if run is None:
+        raise ResponseCacheMiss(f"No cached run recorded for source {source_id}")
+    return {"cache_mode": "replay", **run}
+
+
+def replay_scrape(source_id: int, run_until: Optional[datetime] = None):
+    # Re-runs a past scrape entirely from cached responses, without calling the APIs.
+    return preform_single_scrape(source_id, **replay_options(source_id, run_until))
+
+
+def scrape_many(source_ids: Iterable[int], max_workers: Optional[int] = None) -> dict:
+    # Runs the sources on a worker pool; per-provider rate limiters keep the workers under quota.
+    max_workers = max_workers or int(os.getenv("SCRAPE_MAX_WORKERS", "8"))
+    per_source = {}
+    totals = {"inserted": 0, "modified": 0, "unchanged": 0, "failed": 0, "sources_succeeded": 0, "sources_failed": 0}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(preform_single_scrape, source_id): source_id for source_id in source_ids}
+        for future in as_completed(futures):
+            source_id = futures[future]
+            try:
+                stats = future.result()
+            except Exception as e:
+                logging.getLogger(__name__).error(f"Scrape failed for source {source_id}: {e}")
+                per_source[source_id] = {"error": str(e)}
+                totals["sources_failed"] += 1
+                continue
+            per_source[source_id] = stats
+            totals["sources_succeeded"] += 1
+            for key in ("inserted", "modified", "unchanged", "failed"):
+                totals[key] += stats.get(key, 0)
+    return {"sources": per_source, "totals": totals}
+
+
+def scrape_all(max_workers: Optional[int] = None) -> dict:
+    return scrape_many(DbSettings().get_source_ids(), max_workers=max_workers)
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "init_db":
+        # Note: Creates and upgrades the schema once, e.g. before running with DB_AUTO_INIT=false.
+        init_db()
+        print("Database initialized.")
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild_converted_prices":
+        # Note: Full rebuild of stock_prices_converted, e.g. after a backfill.
+        rows = DbData().rebuild_converted_prices()
+        print(f"Rebuilt stock_prices_converted with {rows} rows.")
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "export_parquet":
+        # Note: Incremental unless "--full" is passed; the directory defaults to PARQUET_EXPORT_DIR.
+        export_dir = next((arg for arg in sys.argv[2:] if arg != "--full"),
+                          os.getenv("PARQUET_EXPORT_DIR", "parquet_export"))
+        written = ParquetExporter(export_dir).export(full="--full" in sys.argv[2:])
+        print(f"Exported partitions to {export_dir}: {written}")
+        sys.exit(0)
+
     # Sample test for polygon source.
     source1 = {
         "source_id": 1,
@@ -0,0 +1,224 @@
+import abc
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_current_run: contextvars.ContextVar[Optional["RunMetrics"]] = contextvars.ContextVar("current_run", default=None)
+
+
+class RunMetrics:
+    """
+    Timings and counters for one source run. Stage times are summed in seconds; stages are
+    rate_limit_wait, http_fetch, parse, process_row, db_lookup, db_write and db_commit.
+    """
+
+    def __init__(self, source_id: int, source_type: str):
+        self.source_id = source_id
+        self.source_type = source_type
+        self.started_at = time.time()
+        self.stage_seconds: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {"bytes_downloaded": 0, "http_requests": 0, "http_retries": 0,
+                                         "http_rate_limited": 0, "db_queries": 0}
+        self.stats: Dict[str, int] = {}
+        self.duration_seconds = 0.0
+        self.status = "running"
+        self._lock = threading.Lock()
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+
+    def increment(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    @property
+    def rows(self) -> int:
+        return sum(self.stats.get(key, 0) for key in ("inserted", "modified", "unchanged"))
+
+    def to_dict(self) -> dict:
+        return {
+            "source_id": self.source_id,
+            "source_type": self.source_type,
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(),
+            "status": self.status,
+            "duration_seconds": self.duration_seconds,
+            "rows": self.rows,
+            "rows_per_second": self.rows / self.duration_seconds if self.duration_seconds else 0.0,
+            "stats": dict(self.stats),
+            "stage_seconds": dict(self.stage_seconds),
+            **self.counters,
+        }
+
+
+def current_run() -> Optional[RunMetrics]:
+    return _current_run.get()
+
+
+def increment(counter: str, amount: int = 1) -> None:
+    # No-op outside an instrumented run, so shared code can report unconditionally.
+    run = _current_run.get()
+    if run is not None:
+        run.increment(counter, amount)
+
+
+@contextmanager
+def stage(name: str):
+    run = _current_run.get()
+    if run is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.add_time(name, time.perf_counter() - started)
+
+
+@contextmanager
+def track_run(source_id: int, source_type: str):
+    # Makes a RunMetrics current for the block and emits it to the configured sinks afterwards.
+    run = RunMetrics(source_id, source_type)
+    token = _current_run.set(run)
+    started = time.perf_counter()
+    try:
+        yield run
+        run.status = "success"
+    except Exception:
+        run.status = "failed"
+        raise
+    finally:
+        run.duration_seconds = time.perf_counter() - started
+        _current_run.reset(token)
+        for sink in get_metrics_sinks():
+            sink.emit(run)
+
+
+def instrument_engine(engine: Engine) -> None:
+    # Attributes each statement's execution time to db_lookup (SELECT) or db_write on the current run.
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append((context, time.perf_counter()))
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        _, started = conn.info["query_started"].pop()
+        run = _current_run.get()
+        if run is not None:
+            is_lookup = statement.lstrip().upper().startswith(("SELECT", "WITH"))
+            run.add_time("db_lookup" if is_lookup else "db_write", time.perf_counter() - started)
+            run.increment("db_queries")
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(exception_context):
+        # Note: A failed statement never reaches after_cursor_execute, so its entry is dropped here;
+        # otherwise later statements on the pooled connection would be timed from it.
+        conn = exception_context.connection
+        stack = conn.info.get("query_started") if conn is not None else None
+        if stack and stack[-1][0] is exception_context.execution_context:
+            stack.pop()
+
+
+class MetricsSink(abc.ABC):
+    @abc.abstractmethod
+    def emit(self, run: RunMetrics) -> None:
+        pass
+
+
+class JsonLinesSink(MetricsSink):
+    """Appends one JSON object per source run to a file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, run: RunMetrics) -> None:
+        line = json.dumps(run.to_dict())
+        with self._lock, open(self.path, "a") as file:
+            file.write(line + "\n")
+
+
+class PrometheusTextSink(MetricsSink):
+    """
+    Accumulates runs into Prometheus counters and gauges labelled by source.
+    render() returns the text exposition format; with a path, the file is rewritten after
+    every run for the node_exporter textfile collector.
+    """
+
+    def __init__(self, path: Optional[str] = None, prefix: str = "collector"):
+        self.path = path
+        self.prefix = prefix
+        self._counters: Dict[tuple, float] = {}
+        self._gauges: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def emit(self, run: RunMetrics) -> None:
+        labels = (("source_id", str(run.source_id)), ("source_type", run.source_type))
+        with self._lock:
+            self._add_counter("runs_total", labels + (("status", run.status),), 1)
+            self._add_counter("run_seconds_total", labels, run.duration_seconds)
+            self._add_counter("rows_total", labels, run.rows)
+            for name, value in run.counters.items():
+                self._add_counter(f"{name}_total", labels, value)
+            for stage_name, seconds in run.stage_seconds.items():
+                self._add_counter("stage_seconds_total", labels + (("stage", stage_name),), seconds)
+            self._gauges[("rows_per_second", labels)] = run.to_dict()["rows_per_second"]
+            self._gauges[("last_run_timestamp_seconds", labels)] = run.started_at + run.duration_seconds
+            text = self._render()
+        if self.path:
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w") as file:
+                file.write(text)
+            os.replace(temp_path, self.path)
+
+    def _add_counter(self, name: str, labels: tuple, value: float) -> None:
+        self._counters[(name, labels)] = self._counters.get((name, labels), 0) + value
+
+    def render(self) -> str:
+        with self._lock:
+            return self._render()
+
+    def _render(self) -> str:
+        lines = []
+        for kind, series in (("counter", self._counters), ("gauge", self._gauges)):
+            for name in sorted({name for name, _ in series}):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} {kind}")
+                for (series_name, labels), value in sorted(series.items()):
+                    if series_name == name:
+                        label_text = ",".join(f'{key}="{value_}"' for key, value_ in labels)
+                        lines.append(f"{metric}{{{label_text}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+_sinks: Optional[List[MetricsSink]] = None
+_sinks_lock = threading.Lock()
+
+
+def get_metrics_sinks() -> List[MetricsSink]:
+    # Configured by METRICS_SINKS, e.g. "jsonl:metrics.jsonl,prometheus:metrics.prom".
+    global _sinks
+    with _sinks_lock:
+        if _sinks is None:
+            _sinks = []
+            for spec in filter(None, (s.strip() for s in os.getenv("METRICS_SINKS", "").split(","))):
+                kind, _, path = spec.partition(":")
+                if kind == "jsonl":
+                    _sinks.append(JsonLinesSink(path or "metrics.jsonl"))
+                elif kind == "prometheus":
+                    _sinks.append(PrometheusTextSink(path or None))
+                else:
+                    raise ValueError(f"Unknown metrics sink: {kind}")
+        return _sinks
+
+
+def add_metrics_sink(sink: MetricsSink) -> None:
+    get_metrics_sinks().append(sink)
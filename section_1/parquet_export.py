@@ -0,0 +1,205 @@
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy.future import select
+
+from section_1.database import DbData, StockRecordModel, TABLE_MODELS
+from section_1.fx_cache import FxRateCache
+
+STATE_FILE = "_export_state.json"
+# Note: Writes stamp updated_at before they commit, so each run looks back this far to catch rows
+# committed after the previous export read past their timestamp. Rewriting a partition is idempotent.
+UPDATE_OVERLAP = timedelta(minutes=5)
+PARTITION_FILE = "data.parquet"
+
+
+def _partition_key(table_end: str, frame: pd.DataFrame) -> pd.Series:
+    if table_end == "stock_records":
+        return "ticker=" + frame["stock_ticker"]
+    return "pair=" + frame["base_currency"] + "_" + frame["target_currency"]
+
+
+def _month_key(dates: pd.Series) -> pd.Series:
+    return "month=" + dates.dt.strftime("%Y-%m")
+
+
+class ParquetExporter:
+    """
+    Exports stock_records and exchange_rate_records to Parquet under
+    <root>/<table>/<ticker=X | pair=BASE_TARGET>/month=YYYY-MM/data.parquet.
+    Each run only rewrites the partitions holding rows inserted or changed since the last export
+    (tracked by the records' updated_at in _export_state.json); full=True re-exports everything.
+    """
+
+    def __init__(self, root: str, db_data: Optional[DbData] = None):
+        self.root = root
+        self.db_data = db_data or DbData()
+        os.makedirs(root, exist_ok=True)
+
+    def _load_state(self) -> dict:
+        path = os.path.join(self.root, STATE_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as file:
+            return json.load(file)
+
+    def _save_state(self, state: dict) -> None:
+        path = os.path.join(self.root, STATE_FILE)
+        with open(f"{path}.tmp", "w") as file:
+            json.dump(state, file, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+    def export(self, full: bool = False) -> Dict[str, int]:
+        # Returns the number of partitions written per table.
+        state = self._load_state()
+        written = {}
+        for table_end in TABLE_MODELS:
+            last_updated_at = None if full else state.get(table_end, {}).get("last_updated_at")
+            since = datetime.fromisoformat(last_updated_at) - UPDATE_OVERLAP if last_updated_at else None
+            partitions, max_updated_at = self._export_table(table_end, since)
+            if max_updated_at is not None and (last_updated_at is None or
+                                               max_updated_at > datetime.fromisoformat(last_updated_at)):
+                last_updated_at = max_updated_at.isoformat()
+            state[table_end] = {"last_updated_at": last_updated_at, "exported_at": datetime.now().isoformat()}
+            written[table_end] = partitions
+        self._save_state(state)
+        return written
+
+    def _export_table(self, table_end: str, since: Optional[datetime]):
+        model = TABLE_MODELS[table_end]
+        group_column = model.stock_ticker if table_end == "stock_records" else model.base_currency
+        with self.db_data.get_db_session() as session:
+            # Note: Only partitions holding rows inserted or updated since the last export are rewritten;
+            # without a previous export every row counts, including rows written before updated_at existed.
+            touched_stmt = select(*self._group_columns(model), model.date, model.updated_at)
+            if since is not None:
+                touched_stmt = touched_stmt.where(model.updated_at > since)
+            touched = pd.DataFrame(session.execute(touched_stmt).all(),
+                                   columns=[c.key for c in self._group_columns(model)] + ["date", "updated_at"])
+        if touched.empty:
+            return 0, None
+        touched["date"] = pd.to_datetime(touched["date"])
+        touched["partition"] = _partition_key(table_end, touched)
+        touched["month"] = _month_key(touched["date"])
+        partitions = 0
+        for group_value, group in touched.groupby(group_column.key):
+            month_starts = group["date"].dt.to_period("M")
+            date_from = month_starts.min().start_time.to_pydatetime()
+            date_to = month_starts.max().end_time.to_pydatetime()
+            frame = self._read_records(model, group_column == group_value, date_from, date_to)
+            frame["partition"] = _partition_key(table_end, frame)
+            frame["month"] = _month_key(frame["date"])
+            wanted = set(zip(group["partition"], group["month"]))
+            for (partition, month), rows in frame.groupby(["partition", "month"]):
+                if (partition, month) in wanted:
+                    self._write_partition(table_end, partition, month, rows.drop(columns=["partition", "month"]))
+                    partitions += 1
+        max_updated_at = pd.to_datetime(touched["updated_at"]).max()
+        return partitions, None if pd.isna(max_updated_at) else max_updated_at.to_pydatetime()
+
+    @staticmethod
+    def _group_columns(model) -> list:
+        if model is StockRecordModel:
+            return [model.stock_ticker]
+        return [model.base_currency, model.target_currency]
+
+    def _read_records(self, model, condition, date_from: datetime, date_to: datetime) -> pd.DataFrame:
+        columns = [c for c in model.__table__.columns]
+        with self.db_data.get_db_session() as session:
+            stmt = select(*columns).where(condition).where(model.date.between(date_from, date_to))
+            frame = pd.DataFrame(session.execute(stmt).all(), columns=[c.name for c in columns])
+        frame["date"] = pd.to_datetime(frame["date"]).astype("datetime64[ms]")
+        return frame
+
+    def _write_partition(self, table_end: str, partition: str, month: str, rows: pd.DataFrame) -> None:
+        directory = os.path.join(self.root, table_end, partition, month)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, PARTITION_FILE)
+        table = pa.Table.from_pandas(rows.sort_values(["date", "id"]), preserve_index=False)
+        pq.write_table(table, f"{path}.tmp", compression="zstd")
+        os.replace(f"{path}.tmp", path)
+
+
+class ParquetStore:
+    """
+    Read API over an export: partition directories are pruned by key and month, and files are
+    read memory-mapped with only the requested columns.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _partition_files(self, table_end: str, partitions: Iterable[str], date_from: datetime,
+                         date_to: datetime) -> List[str]:
+        first_month, last_month = date_from.strftime("%Y-%m"), date_to.strftime("%Y-%m")
+        files = []
+        for partition in partitions:
+            directory = os.path.join(self.root, table_end, partition)
+            if not os.path.isdir(directory):
+                continue
+            for month_directory in sorted(os.listdir(directory)):
+                month = month_directory.partition("=")[2]
+                path = os.path.join(directory, month_directory, PARTITION_FILE)
+                if first_month <= month <= last_month and os.path.exists(path):
+                    files.append(path)
+        return files
+
+    def _read(self, files: List[str], columns: Optional[List[str]], date_from: datetime,
+              date_to: datetime, key_columns: List[str]) -> pd.DataFrame:
+        read_columns = None if columns is None else sorted(set(columns) | set(key_columns) | {"date", "id"})
+        tables = [pq.read_table(path, columns=read_columns, memory_map=True) for path in files]
+        if not tables:
+            return pd.DataFrame(columns=read_columns or [])
+        frame = pa.concat_tables(tables).to_pandas()
+        frame = frame[(frame["date"] >= date_from) & (frame["date"] <= date_to)]
+        # Note: When several sources hold the same key and date, the most recently written row wins.
+        frame = frame.sort_values("id").drop_duplicates(key_columns + ["date"], keep="last")
+        frame = frame.sort_values(key_columns + ["date"], ignore_index=True)
+        return frame if columns is None else frame[list(dict.fromkeys(key_columns + ["date"] + columns))]
+
+    def read_stock_records(self, tickers: Iterable[str], date_from: datetime, date_to: datetime,
+                           columns: Optional[List[str]] = None) -> pd.DataFrame:
+        files = self._partition_files("stock_records", [f"ticker={t}" for t in tickers], date_from, date_to)
+        return self._read(files, columns, date_from, date_to, ["stock_ticker"])
+
+    def read_exchange_rates(self, pairs: Iterable[tuple], date_from: datetime, date_to: datetime) -> pd.DataFrame:
+        files = self._partition_files("exchange_rate_records", [f"pair={b}_{t}" for b, t in pairs],
+                                      date_from, date_to)
+        return self._read(files, ["rate"], date_from, date_to, ["base_currency", "target_currency"])
+
+    def _all_pairs(self) -> List[tuple]:
+        directory = os.path.join(self.root, "exchange_rate_records")
+        if not os.path.isdir(directory):
+            return []
+        return [tuple(name.partition("=")[2].split("_", 1)) for name in os.listdir(directory)]
+
+    def get_stock_prices(self, tickers: Iterable[str], date_from: datetime, date_to: datetime,
+                         currencies: Iterable[str], max_rate_age_days: int = 7) -> pd.DataFrame:
+        """
+        Close prices per ticker, trading day and currency from the exported files.
+        Rates are matched as-of (at most max_rate_age_days old), with inverse and cross rates
+        resolved by FxRateCache.
+        """
+        stocks = self.read_stock_records(tickers, date_from, date_to, ["close", "base_currency"])
+        # Note: Rates from the month before the range seed the as-of match for its first days.
+        rates_from = (pd.Timestamp(date_from) - pd.DateOffset(months=1)).to_pydatetime()
+        rates = self.read_exchange_rates(self._all_pairs(), rates_from, date_to)
+        fx_cache = FxRateCache()
+        fx_cache.load(rates[["base_currency", "target_currency", "date", "rate"]].itertuples(index=False, name=None))
+        frames = []
+        pairs = stocks[["base_currency", "date"]].drop_duplicates()
+        for currency in currencies:
+            pair_rates = pairs.assign(rate=[fx_cache.get_rate(base, currency, date,
+                                                                              max_age_days=max_rate_age_days)
+                                            for base, date in pairs.itertuples(index=False, name=None)])
+            converted = stocks.merge(pair_rates, on=["base_currency", "date"]).dropna(subset=["rate"])
+            frames.append(converted.assign(currency=currency, close=converted["close"] * converted["rate"]))
+        if not frames:
+            return pd.DataFrame(columns=["stock_ticker", "date", "currency", "close"])
+        result = pd.concat(frames, ignore_index=True)[["stock_ticker", "date", "currency", "close"]]
+        return result.astype({"close": float}).sort_values(["stock_ticker", "date", "currency"], ignore_index=True)
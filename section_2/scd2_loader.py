@@ -0,0 +1,226 @@
+import logging
+import os
+import re
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+import pandas as pd
+from dotenv import load_dotenv
+from sqlalchemy import bindparam, create_engine, inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "star_marketing.sql")
+# Note: Current dimension versions carry the schema's open-ended valid_to.
+OPEN_VALID_TO = "9999-12-31 00:00:00"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+HIERARCHY_COLUMNS = [
+    "account_id", "account_name", "sub_account_id", "sub_account_name", "portfolio_id", "portfolio_name",
+    "campaign_id", "campaign_name", "ad_group_id", "ad_group_name", "ad_id", "ad_name",
+]
+FACT_COLUMNS = ["click_date", "view_date", "device", "geo", "cost", "impressions", "clicks", "bid", "label"]
+EXTRACT_COLUMNS = HIERARCHY_COLUMNS + FACT_COLUMNS
+REQUIRED_COLUMNS = HIERARCHY_COLUMNS + ["device", "geo", "cost", "impressions", "clicks", "bid"]
+
+
+def schema_statements(dialect: str) -> List[str]:
+    """
+    Splits star_marketing.sql into statements for the target dialect.
+    SQLite has no SERIAL, so surrogate keys become INTEGER PRIMARY KEY AUTOINCREMENT there.
+    """
+    with open(SCHEMA_PATH) as file:
+        sql = file.read()
+    if dialect == "sqlite":
+        sql = re.sub(r"\bSERIAL PRIMARY KEY\b", "INTEGER PRIMARY KEY AUTOINCREMENT", sql)
+    statements = [statement.strip() for statement in sql.split(";")]
+    # Note: Transactions are managed by the loader, so the script's trailing COMMIT is dropped.
+    return [statement for statement in statements if statement and statement.upper() != "COMMIT"]
+
+
+def bootstrap_schema(engine: Engine) -> None:
+    # Creates the star schema's tables that do not exist yet.
+    existing = set(inspect(engine).get_table_names())
+    with engine.begin() as connection:
+        for statement in schema_statements(engine.dialect.name):
+            table = re.match(r"CREATE TABLE (\w+)", statement)
+            if table is None or table.group(1) not in existing:
+                connection.execute(text(statement))
+
+
+def read_extract(extract: pd.DataFrame | str) -> pd.DataFrame:
+    # Accepts an hourly extract as a DataFrame or a CSV path holding EXTRACT_COLUMNS (label is optional).
+    if isinstance(extract, str):
+        text_columns = HIERARCHY_COLUMNS + ["device", "geo", "label"]
+        extract = pd.read_csv(extract, dtype={column: str for column in text_columns})
+    missing = [column for column in EXTRACT_COLUMNS if column not in extract.columns and column != "label"]
+    if missing:
+        raise ValueError(f"Extract is missing columns: {missing}")
+    return extract.reindex(columns=EXTRACT_COLUMNS)
+
+
+def date_keys(dates: pd.Series) -> pd.Series:
+    # dim_date keys are YYYYMMDD integers; missing dates stay missing.
+    dates = pd.to_datetime(dates)
+    return (dates.dt.year * 10000 + dates.dt.month * 100 + dates.dt.day).astype("Int64")
+
+
+class Scd2Loader:
+    """
+    Loads hourly ad-platform extracts into the star_marketing schema, one transaction per batch:
+    dim_ad_hierarchy is versioned (SCD Type 2) with set-based statements against a staging table,
+    date, device and geo keys are resolved through in-memory caches, and facts are inserted in bulk.
+    """
+
+    def __init__(self, db_url: Optional[str] = None, bootstrap: bool = True):
+        self.engine = create_engine(db_url or os.getenv("MARKETING_DB_URL", "sqlite:///star_marketing.db"))
+        if bootstrap:
+            bootstrap_schema(self.engine)
+        # Note: The small dimensions are cached whole; keys created by a batch join them after its commit.
+        with self.engine.connect() as connection:
+            self.date_keys: Set[int] = set(connection.execute(text("SELECT date_key FROM dim_date")).scalars())
+            self.device_keys: Dict[str, int] = dict(
+                connection.execute(text("SELECT device_name, device_key FROM dim_device")).all())
+            self.geo_keys: Dict[str, int] = dict(
+                connection.execute(text("SELECT geo_name, geo_key FROM dim_geo")).all())
+
+    def load(self, extract: pd.DataFrame | str, loaded_at: Optional[datetime] = None) -> dict:
+        """
+        Applies one extract. loaded_at (default: the start of the current hour) becomes valid_from of new
+        dimension versions and load_timestamp of the facts; reloading the same hour replaces its facts.
+        """
+        frame = read_extract(extract)
+        valid = frame[REQUIRED_COLUMNS].notna().all(axis=1)
+        failed = int((~valid).sum())
+        frame = frame[valid]
+        loaded_at = (loaded_at or datetime.now().replace(minute=0, second=0, microsecond=0)).strftime(TIMESTAMP_FORMAT)
+        if frame.empty:
+            return {"versions_inserted": 0, "versions_closed": 0, "versions_corrected": 0, "versions_skipped": 0,
+                    "facts": 0, "failed": failed}
+
+        with self.engine.begin() as connection:
+            stats = self._apply_scd2(connection, frame, loaded_at)
+            new_dates = self._add_dates(connection, pd.concat([frame["click_date"], frame["view_date"]]))
+            new_devices = self._add_names(connection, "device", frame["device"], self.device_keys)
+            new_geos = self._add_names(connection, "geo", frame["geo"], self.geo_keys)
+            facts = pd.DataFrame({
+                "ad_hierarchy_key": frame["ad_id"].map(self._current_ad_keys(connection)),
+                "click_date_key": date_keys(frame["click_date"]),
+                "view_date_key": date_keys(frame["view_date"]),
+                "device_key": frame["device"].map({**self.device_keys, **new_devices}),
+                "geo_key": frame["geo"].map({**self.geo_keys, **new_geos}),
+                "cost": frame["cost"].astype(float).round(2),
+                "impressions": frame["impressions"].astype("int64"),
+                "clicks": frame["clicks"].astype("int64"),
+                "bid": frame["bid"].astype(float).round(2),
+                "label": frame["label"],
+                "load_timestamp": loaded_at,
+            })
+            self._replace_facts(connection, facts, loaded_at)
+            connection.execute(text("DELETE FROM staging_ad_hierarchy"))
+        self.date_keys |= new_dates
+        self.device_keys.update(new_devices)
+        self.geo_keys.update(new_geos)
+        return {**stats, "facts": len(facts), "failed": failed}
+
+    @staticmethod
+    def _apply_scd2(connection: Connection, frame: pd.DataFrame, loaded_at: str) -> dict:
+        # Note: The last row of an ad in the extract describes its current hierarchy.
+        hierarchy = frame[HIERARCHY_COLUMNS].drop_duplicates("ad_id", keep="last").astype(str)
+        columns = ", ".join(HIERARCHY_COLUMNS)
+        connection.execute(text(f"CREATE TEMPORARY TABLE IF NOT EXISTS staging_ad_hierarchy "
+                                f"({', '.join(f'{c} TEXT NOT NULL' for c in HIERARCHY_COLUMNS)})"))
+        connection.execute(text("DELETE FROM staging_ad_hierarchy"))
+        connection.execute(text(f"INSERT INTO staging_ad_hierarchy ({columns}) "
+                                f"VALUES ({', '.join(f':{c}' for c in HIERARCHY_COLUMNS)})"),
+                           hierarchy.to_dict(orient="records"))
+
+        attributes = [c for c in HIERARCHY_COLUMNS if c != "ad_id"]
+        changed_current = (f"d.ad_id = s.ad_id AND d.valid_to = :open "
+                           f"AND ({' OR '.join(f'd.{c} <> s.{c}' for c in attributes)})")
+        params = {"open": OPEN_VALID_TO, "loaded_at": loaded_at}
+        # Note: A change loaded for an hour before the current version's valid_from would rewrite history out
+        # of order, so it is not applied; the ads are logged and counted instead of being dropped silently.
+        skipped = list(connection.execute(text(
+            f"SELECT d.ad_id FROM dim_ad_hierarchy d JOIN staging_ad_hierarchy s "
+            f"ON {changed_current} AND d.valid_from > :loaded_at"
+        ), params).scalars())
+        if skipped:
+            logger.warning(f"Skipped hierarchy changes of {len(skipped)} ads loaded for {loaded_at}, "
+                           f"before their current version: {skipped[:20]}")
+        # Note: A version opened by this same load hour is corrected in place, so reloading an hour
+        # never collides with the (ad_id, valid_from) unique constraint.
+        corrected = connection.execute(text(
+            f"UPDATE dim_ad_hierarchy AS d SET {', '.join(f'{c} = s.{c}' for c in attributes)} "
+            f"FROM staging_ad_hierarchy s WHERE {changed_current} AND d.valid_from = :loaded_at"
+        ), params).rowcount
+        closed = connection.execute(text(
+            f"UPDATE dim_ad_hierarchy AS d SET valid_to = :loaded_at "
+            f"FROM staging_ad_hierarchy s WHERE {changed_current} AND d.valid_from < :loaded_at"
+        ), params).rowcount
+        # Closed ads and ads seen for the first time have no current version left, so they get a new one.
+        inserted = connection.execute(text(
+            f"INSERT INTO dim_ad_hierarchy ({columns}, valid_from, valid_to) "
+            f"SELECT {', '.join(f's.{c}' for c in HIERARCHY_COLUMNS)}, :loaded_at, :open "
+            f"FROM staging_ad_hierarchy s WHERE NOT EXISTS ("
+            f"SELECT 1 FROM dim_ad_hierarchy d WHERE d.ad_id = s.ad_id AND d.valid_to = :open)"
+        ), params).rowcount
+        return {"versions_inserted": inserted, "versions_closed": closed, "versions_corrected": corrected,
+                "versions_skipped": len(skipped)}
+
+    @staticmethod
+    def _current_ad_keys(connection: Connection) -> Dict[str, int]:
+        rows = connection.execute(text(
+            "SELECT d.ad_id, d.ad_hierarchy_key FROM dim_ad_hierarchy d "
+            "JOIN staging_ad_hierarchy s ON s.ad_id = d.ad_id WHERE d.valid_to = :open"
+        ), {"open": OPEN_VALID_TO})
+        return dict(rows.all())
+
+    def _add_dates(self, connection: Connection, dates: pd.Series) -> Set[int]:
+        # Inserts dim_date rows for dates not seen before and returns their keys.
+        days = pd.Series(pd.to_datetime(dates.dropna()).dt.normalize().unique())
+        days = days[~date_keys(days).isin(self.date_keys)]
+        if days.empty:
+            return set()
+        rows = [{"date_key": day.year * 10000 + day.month * 100 + day.day, "full_date": day.strftime("%Y-%m-%d"),
+                 "year": day.year, "quarter": day.quarter, "month": day.month, "day": day.day,
+                 "day_of_week": day.isoweekday()} for day in days]
+        connection.execute(text(
+            "INSERT INTO dim_date (date_key, full_date, year, quarter, month, day, day_of_week) "
+            "VALUES (:date_key, :full_date, :year, :quarter, :month, :day, :day_of_week)"
+        ), rows)
+        return {row["date_key"] for row in rows}
+
+    @staticmethod
+    def _add_names(connection: Connection, dimension: str, names: pd.Series, cache: Dict[str, int]) -> Dict[str, int]:
+        # Inserts device / geo names missing from the cache and returns their new keys.
+        missing = sorted(set(names) - set(cache))
+        if not missing:
+            return {}
+        connection.execute(text(f"INSERT INTO dim_{dimension} ({dimension}_name) VALUES (:name)"),
+                           [{"name": name} for name in missing])
+        stmt = text(f"SELECT {dimension}_name, {dimension}_key FROM dim_{dimension} "
+                    f"WHERE {dimension}_name IN :names").bindparams(bindparam("names", expanding=True))
+        return dict(connection.execute(stmt, {"names": missing}).all())
+
+    @staticmethod
+    def _replace_facts(connection: Connection, facts: pd.DataFrame, loaded_at: str) -> None:
+        # Note: Facts already loaded for this hour and these ads are replaced, so an hour can be re-run.
+        connection.execute(text(
+            "DELETE FROM fact_ad_performance WHERE load_timestamp = :loaded_at AND ad_hierarchy_key IN ("
+            "SELECT d.ad_hierarchy_key FROM dim_ad_hierarchy d JOIN staging_ad_hierarchy s ON s.ad_id = d.ad_id)"
+        ), {"loaded_at": loaded_at})
+        columns = list(facts.columns)
+        rows = facts.astype(object).where(facts.notna(), None).to_dict(orient="records")
+        connection.execute(text(f"INSERT INTO fact_ad_performance ({', '.join(columns)}) "
+                                f"VALUES ({', '.join(f':{c}' for c in columns)})"), rows)
+
+
+if __name__ == "__main__":
+    # Usage: python scd2_loader.py extract.csv [more.csv ...]; each file is loaded as its own batch.
+    loader = Scd2Loader()
+    for path in sys.argv[1:]:
+        print(f"{path}: {loader.load(path)}")
@@ -32,7 +32,7 @@ CREATE TABLE dim_device (
     device_name TEXT NOT NULL
 );
 
-CREATE TABLE dim_gveo (
+CREATE TABLE dim_geo (
     geo_key  SERIAL PRIMARY KEY,
     geo_name TEXT NOT NULL
 );
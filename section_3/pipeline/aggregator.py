@@ -0,0 +1,67 @@
+import threading
+import time
+from collections import Counter, deque
+from typing import Deque, Iterable, Optional, Tuple
+
+OTHER = "__other__"
+
+
+class RollingWindowAggregator:
+    """
+    Real-time counts of events per (event_type, chart_id) over the last window_seconds.
+    Counts are kept in one bucket per bucket_seconds plus running window totals, so memory is bounded
+    by (window_seconds / bucket_seconds) * max_keys_per_bucket regardless of traffic; charts beyond
+    max_keys_per_bucket in a bucket are folded into "__other__".
+    """
+
+    def __init__(self, window_seconds: int = 300, bucket_seconds: int = 1, max_keys_per_bucket: int = 10_000):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.max_keys_per_bucket = max_keys_per_bucket
+        self._buckets: Deque[Tuple[int, Counter]] = deque()
+        self._totals: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, keys: Iterable[Tuple[str, str]], now: Optional[float] = None) -> None:
+        bucket_id = int((now or time.time()) // self.bucket_seconds)
+        with self._lock:
+            self._expire(bucket_id)
+            if not self._buckets or self._buckets[-1][0] != bucket_id:
+                self._buckets.append((bucket_id, Counter()))
+            bucket = self._buckets[-1][1]
+            for event_type, chart_id in keys:
+                key = (event_type, chart_id)
+                if key not in bucket and len(bucket) >= self.max_keys_per_bucket:
+                    key = (event_type, OTHER)
+                bucket[key] += 1
+                self._totals[key] += 1
+
+    def _expire(self, bucket_id: int) -> None:
+        oldest = bucket_id - self.window_seconds // self.bucket_seconds + 1
+        while self._buckets and self._buckets[0][0] < oldest:
+            _, bucket = self._buckets.popleft()
+            self._totals.subtract(bucket)
+            for key in bucket:
+                if self._totals[key] <= 0:
+                    del self._totals[key]
+
+    def snapshot(self, top: int = 10, now: Optional[float] = None) -> dict:
+        # Window totals per event type, events/sec and the charts with the most clicks (with CTR).
+        with self._lock:
+            self._expire(int((now or time.time()) // self.bucket_seconds))
+            totals = Counter(self._totals)
+            tracked_keys = sum(len(bucket) for _, bucket in self._buckets)
+            # Note: Until the window has filled, the rate is taken over the seconds actually observed.
+            span = (self._buckets[-1][0] - self._buckets[0][0] + 1) * self.bucket_seconds if self._buckets else 1
+        per_type = Counter()
+        for (event_type, _), count in totals.items():
+            per_type[event_type] += count
+        clicks = Counter({chart: count for (event_type, chart), count in totals.items() if event_type == "click"})
+        top_charts = [
+            {"chart_id": chart, "clicks": count, "page_views": totals[("page_view", chart)],
+             "ctr": count / totals[("page_view", chart)] if totals[("page_view", chart)] else None}
+            for chart, count in clicks.most_common(top)
+        ]
+        return {"window_seconds": self.window_seconds, "events": sum(per_type.values()),
+                "events_per_second": sum(per_type.values()) / span,
+                "per_type": dict(per_type), "top_charts": top_charts, "tracked_keys": tracked_keys}
@@ -0,0 +1,107 @@
+"""
+Batch job over the local lake, standing in for the scheduled ETL:
+- compaction merges an hour's small raw part files into one sorted, large-row-group file;
+- sessionization groups each user's compacted events of a day into sessions split by inactivity.
+
+    python -m section_3.pipeline.compaction --lake event_lake [--include-open-hour] [--session-gap-minutes 30]
+
+Only closed hours (before the current UTC hour) are compacted unless --include-open-hour is given.
+"""
+import argparse
+import os
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+from section_3.pipeline.lake import COMPACTED_PREFIX, RAW_PREFIX, SESSIONS_PREFIX, LocalLake
+
+COMPACTED_FILE = "events.parquet"
+SESSIONS_FILE = "sessions.parquet"
+# Note: Large row groups keep the compacted files cheap to scan; raw micro-batches are far smaller.
+ROW_GROUP_SIZE = 1_000_000
+SESSION_COLUMNS = ["user_id", "event_time", "event_type", "chart_id"]
+
+
+def compact_hour(lake: LocalLake, date: str, hour: int) -> dict:
+    """
+    Merges the hour's raw files (and its earlier compacted file, if any) into one file sorted by user and time,
+    then removes the raw files it merged. Files written while it runs are left for the next run.
+    """
+    raw_files = lake.files(RAW_PREFIX, date, hour)
+    if not raw_files:
+        return {"date": date, "hour": hour, "raw_files": 0, "events": 0}
+    compacted_path = os.path.join(lake.partition_dir(COMPACTED_PREFIX, date, hour), COMPACTED_FILE)
+    sources = raw_files + ([compacted_path] if os.path.exists(compacted_path) else [])
+    table = lake.read(sources)
+    # Note: Events retried by clients can arrive twice; the first received copy is kept.
+    frame = table.to_pandas().sort_values("received_at").drop_duplicates("event_id")
+    frame = frame.sort_values(["user_id", "event_time"], ignore_index=True)
+    lake.write_table(pa.Table.from_pandas(frame, schema=table.schema, preserve_index=False), compacted_path,
+                     row_group_size=ROW_GROUP_SIZE)
+    for path in raw_files:
+        os.remove(path)
+    return {"date": date, "hour": hour, "raw_files": len(raw_files), "events": len(frame),
+            "bytes": os.path.getsize(compacted_path)}
+
+
+def sessionize_date(lake: LocalLake, date: str, gap_minutes: int = 30) -> dict:
+    """
+    Builds the day's sessions from its compacted hours: a user's session ends after gap_minutes without events.
+    Sessions spanning midnight are split at the date boundary.
+    """
+    table = lake.read(lake.files(COMPACTED_PREFIX, date), columns=SESSION_COLUMNS)
+    if table is None or table.num_rows == 0:
+        return {"date": date, "sessions": 0}
+    frame = table.to_pandas().sort_values(["user_id", "event_time"], ignore_index=True)
+    gap = np.timedelta64(gap_minutes, "m")
+    new_session = frame["user_id"].ne(frame["user_id"].shift()) | frame["event_time"].diff().gt(gap)
+    frame["session"] = new_session.cumsum()
+    frame["page_view"] = frame["event_type"].eq("page_view")
+    frame["click"] = frame["event_type"].eq("click")
+    sessions = frame.groupby("session").agg(
+        user_id=("user_id", "first"),
+        session_start=("event_time", "min"),
+        session_end=("event_time", "max"),
+        events=("event_type", "size"),
+        page_views=("page_view", "sum"),
+        clicks=("click", "sum"),
+        charts=("chart_id", "nunique"),
+    ).reset_index(drop=True)
+    sessions.insert(0, "session_id", sessions["user_id"] + "-" +
+                    sessions["session_start"].astype("int64").astype(str))
+    sessions["duration_seconds"] = (sessions["session_end"] - sessions["session_start"]).dt.total_seconds()
+    path = os.path.join(lake.partition_dir(SESSIONS_PREFIX, date), SESSIONS_FILE)
+    lake.write_table(pa.Table.from_pandas(sessions, preserve_index=False), path)
+    return {"date": date, "sessions": len(sessions), "events": int(sessions["events"].sum())}
+
+
+def closed_partitions(lake: LocalLake, include_open_hour: bool = False,
+                      now: Optional[datetime] = None) -> List[Tuple[str, int]]:
+    current = (now or datetime.now(timezone.utc)).strftime("%Y-%m-%d %H")
+    return [(date, hour) for date, hour in lake.partitions(RAW_PREFIX)
+            if include_open_hour or f"{date} {hour:02d}" < current]
+
+
+def run(lake: LocalLake, include_open_hour: bool = False, gap_minutes: int = 30) -> dict:
+    compacted = [compact_hour(lake, date, hour) for date, hour in closed_partitions(lake, include_open_hour)]
+    dates = sorted({result["date"] for result in compacted})
+    return {"compacted": compacted, "sessions": [sessionize_date(lake, date, gap_minutes) for date in dates]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lake", default=os.getenv("EVENT_LAKE_DIR", "event_lake"))
+    parser.add_argument("--include-open-hour", action="store_true", help="Also compact the current hour.")
+    parser.add_argument("--session-gap-minutes", type=int, default=30)
+    args = parser.parse_args()
+    result = run(LocalLake(args.lake), args.include_open_hour, args.session_gap_minutes)
+    for item in result["compacted"]:
+        print(f"compacted {item}")
+    for item in result["sessions"]:
+        print(f"sessionized {item}")
+
+
+if __name__ == "__main__":
+    main()
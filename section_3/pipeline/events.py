@@ -0,0 +1,54 @@
+import uuid
+from typing import List, Optional, Tuple
+
+import pyarrow as pa
+
+EVENT_TYPES = ("page_view", "click")
+
+# Note: Times are epoch milliseconds (UTC). sent_at is stamped by the client and drives end-to-end latency.
+EVENT_SCHEMA = pa.schema([
+    ("event_id", pa.string()),
+    ("event_type", pa.string()),
+    ("user_id", pa.string()),
+    ("chart_id", pa.string()),
+    ("item_id", pa.string()),
+    ("page_url", pa.string()),
+    ("event_time", pa.timestamp("ms")),
+    ("sent_at", pa.timestamp("ms")),
+    ("received_at", pa.timestamp("ms")),
+])
+
+
+def normalize_event(raw: dict, received_at: int) -> Optional[dict]:
+    # Returns the event in EVENT_SCHEMA's shape, or None when it cannot be stored.
+    if not isinstance(raw, dict) or raw.get("event_type") not in EVENT_TYPES:
+        return None
+    if not raw.get("user_id") or not raw.get("chart_id"):
+        return None
+    try:
+        event_time = int(raw.get("event_time") or received_at)
+        sent_at = int(raw.get("sent_at") or received_at)
+    except (TypeError, ValueError):
+        return None
+    return {
+        "event_id": str(raw.get("event_id") or uuid.uuid4().hex),
+        "event_type": raw["event_type"],
+        "user_id": str(raw["user_id"]),
+        "chart_id": str(raw["chart_id"]),
+        "item_id": None if raw.get("item_id") is None else str(raw["item_id"]),
+        "page_url": raw.get("page_url"),
+        "event_time": event_time,
+        "sent_at": sent_at,
+        "received_at": received_at,
+    }
+
+
+def normalize_events(payload, received_at: int) -> Tuple[List[dict], int]:
+    # Accepts one event or a list of events; returns the valid events and the number rejected.
+    raw_events = payload if isinstance(payload, list) else [payload]
+    events = [event for event in (normalize_event(raw, received_at) for raw in raw_events) if event is not None]
+    return events, len(raw_events) - len(events)
+
+
+def events_table(events: List[dict]) -> pa.Table:
+    return pa.Table.from_pylist(events, schema=EVENT_SCHEMA)
@@ -0,0 +1,68 @@
+import asyncio
+import json
+from typing import Dict, Optional, Tuple
+
+# Note: A minimal HTTP/1.1 (keep-alive, Content-Length bodies) reader/writer for the local intake and
+# load generator, so the pipeline runs on the standard library's asyncio streams alone.
+REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large"}
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+
+class PayloadTooLarge(ValueError):
+    """Raised by read_request for bodies over MAX_BODY_BYTES; other ValueErrors mean a malformed request."""
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Optional[Tuple[str, Dict[str, str]]]:
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name:
+            headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    # Returns (method, path, headers, body), or None once the client has closed the connection.
+    head = await _read_head(reader)
+    if head is None:
+        return None
+    request_line, headers = head
+    parts = request_line.split(" ", 2)
+    if len(parts) != 3:
+        raise ValueError(f"Malformed request line: {request_line[:100]!r}")
+    method, path, _ = parts
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise ValueError(f"Malformed Content-Length: {headers['content-length'][:100]!r}") from None
+    if length < 0:
+        raise ValueError(f"Malformed Content-Length: {length}")
+    if length > MAX_BODY_BYTES:
+        raise PayloadTooLarge(f"Request body of {length} bytes exceeds {MAX_BODY_BYTES}")
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+
+async def read_response(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    head = await _read_head(reader)
+    if head is None:
+        raise ConnectionError("Connection closed before a response was received")
+    status_line, headers = head
+    length = int(headers.get("content-length", "0"))
+    return int(status_line.split(" ")[1]), await reader.readexactly(length)
+
+
+def json_response(status: int, payload: dict) -> bytes:
+    body = json.dumps(payload).encode()
+    return (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+
+
+def request(method: str, path: str, host: str, body: bytes = b"") -> bytes:
+    return (f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n").encode() + body
@@ -0,0 +1,183 @@
+"""
+Event intake: accepts comparison-chart events over HTTP, micro-batches them by size and time and writes
+each batch as a compressed Parquet file to the local lake, while feeding the rolling-window aggregator.
+
+    python -m section_3.pipeline.intake --port 8080 --lake event_lake
+
+POST /events takes one JSON event or a JSON array of events and answers 202 once they are buffered.
+GET /stats returns intake counters, end-to-end latency percentiles and the real-time window.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+from collections import deque
+from typing import Deque, List, Optional
+
+import numpy as np
+
+from section_3.pipeline.aggregator import RollingWindowAggregator
+from section_3.pipeline.events import events_table, normalize_events
+from section_3.pipeline.http_io import PayloadTooLarge, json_response, read_request
+from section_3.pipeline.lake import LocalLake
+
+# Note: End-to-end latency is kept for the most recent events only, to bound memory.
+LATENCY_SAMPLES = 200_000
+
+
+class MicroBatcher:
+    """
+    Buffers events and writes them to the lake once max_events are buffered or the oldest buffered
+    event is max_seconds old. At most max_pending_writes batches are written at once; beyond that,
+    add() waits, which pushes back on the HTTP clients instead of growing the buffer.
+    """
+
+    def __init__(self, lake: LocalLake, aggregator: RollingWindowAggregator, max_events: int = 5000,
+                 max_seconds: float = 1.0, max_pending_writes: int = 2):
+        self.lake = lake
+        self.aggregator = aggregator
+        self.max_events = max_events
+        self.max_seconds = max_seconds
+        self._buffer: List[dict] = []
+        self._buffer_started = 0.0
+        self._write_slots = asyncio.Semaphore(max_pending_writes)
+        self._latencies_ms: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.stats = {"accepted": 0, "rejected": 0, "written": 0, "batches": 0, "files": 0, "bytes": 0}
+
+    async def add(self, events: List[dict], rejected: int = 0) -> None:
+        self.stats["accepted"] += len(events)
+        self.stats["rejected"] += rejected
+        self.aggregator.add((event["event_type"], event["chart_id"]) for event in events)
+        if not self._buffer:
+            self._buffer_started = time.monotonic()
+        self._buffer.extend(events)
+        if len(self._buffer) >= self.max_events:
+            await self.flush()
+
+    async def run_timer(self) -> None:
+        # Flushes batches that reached max_seconds without filling up.
+        while True:
+            await asyncio.sleep(self.max_seconds / 4)
+            if self._buffer and time.monotonic() - self._buffer_started >= self.max_seconds:
+                await self.flush()
+
+    async def flush(self) -> None:
+        batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        async with self._write_slots:
+            # Note: Building and compressing the file runs off the event loop, so intake keeps accepting.
+            paths = await asyncio.to_thread(self._write, batch)
+        written_at = time.time() * 1000
+        self._latencies_ms.extend(written_at - np.fromiter((e["sent_at"] for e in batch), float, len(batch)))
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+        self.stats["files"] += len(paths)
+        self.stats["bytes"] += sum(os.path.getsize(path) for path in paths)
+
+    def _write(self, batch: List[dict]) -> List[str]:
+        return self.lake.write_events(events_table(batch))
+
+    def latency_summary(self) -> dict:
+        if not self._latencies_ms:
+            return {"count": 0}
+        samples = np.fromiter(self._latencies_ms, float, len(self._latencies_ms))
+        return {"count": len(samples), "p50_ms": float(np.percentile(samples, 50)),
+                "p95_ms": float(np.percentile(samples, 95)), "p99_ms": float(np.percentile(samples, 99)),
+                "max_ms": float(samples.max())}
+
+
+class EventIntakeServer:
+    def __init__(self, batcher: MicroBatcher, host: str = "127.0.0.1", port: int = 8080):
+        self.batcher = batcher
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._timer: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._timer = asyncio.create_task(self.batcher.run_timer())
+
+    async def stop(self) -> None:
+        # Stops accepting connections and writes whatever is still buffered.
+        self._server.close()
+        await self._server.wait_closed()
+        self._timer.cancel()
+        await self.batcher.flush()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    parsed = await read_request(reader)
+                except ValueError as err:
+                    # Note: Only oversized bodies are 413; a request that cannot be parsed is a 400.
+                    status = 413 if isinstance(err, PayloadTooLarge) else 400
+                    writer.write(json_response(status, {"error": str(err)}))
+                    break
+                if parsed is None:
+                    break
+                method, path, _, body = parsed
+                writer.write(await self._route(method, path, body))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes) -> bytes:
+        if method == "POST" and path == "/events":
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                return json_response(400, {"error": "Body is not valid JSON"})
+            events, rejected = normalize_events(payload, int(time.time() * 1000))
+            await self.batcher.add(events, rejected)
+            return json_response(202, {"accepted": len(events), "rejected": rejected})
+        if method == "GET" and path == "/stats":
+            return json_response(200, {**self.batcher.stats, "latency": self.batcher.latency_summary(),
+                                       "window": self.batcher.aggregator.snapshot()})
+        return json_response(404, {"error": f"No route for {method} {path}"})
+
+
+def build_server(lake_dir: str, host: str = "127.0.0.1", port: int = 8080) -> EventIntakeServer:
+    batcher = MicroBatcher(
+        LocalLake(lake_dir),
+        RollingWindowAggregator(window_seconds=int(os.getenv("EVENT_WINDOW_SECONDS", "300"))),
+        max_events=int(os.getenv("EVENT_BATCH_MAX_EVENTS", "5000")),
+        max_seconds=float(os.getenv("EVENT_BATCH_MAX_SECONDS", "1.0")),
+    )
+    return EventIntakeServer(batcher, host, port)
+
+
+async def serve(lake_dir: str, host: str, port: int) -> None:
+    server = build_server(lake_dir, host, port)
+    await server.start()
+    print(f"Event intake listening on http://{host}:{server.port}, writing to {lake_dir}", flush=True)
+    stopped = asyncio.Event()
+    # Note: SIGTERM (e.g. from the load generator) stops intake after flushing the buffered events.
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)
+    try:
+        await stopped.wait()
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--lake", default=os.getenv("EVENT_LAKE_DIR", "event_lake"))
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.lake, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
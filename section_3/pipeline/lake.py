@@ -0,0 +1,75 @@
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+RAW_PREFIX = "raw/events"
+COMPACTED_PREFIX = "compacted/events"
+SESSIONS_PREFIX = "sessions"
+HOUR_MS = 3_600_000
+
+
+class LocalLake:
+    """
+    Local directory standing in for the S3 data lake. Files are laid out as
+    <root>/<prefix>/date=YYYY-MM-DD/hour=HH/<name>.parquet and written to a temporary name first,
+    so readers only ever see complete files (as with S3 puts).
+    """
+
+    def __init__(self, root: str, compression: str = "zstd"):
+        self.root = root
+        self.compression = compression
+        os.makedirs(root, exist_ok=True)
+
+    def partition_dir(self, prefix: str, date: str, hour: Optional[int] = None) -> str:
+        parts = [self.root, prefix, f"date={date}"]
+        if hour is not None:
+            parts.append(f"hour={hour:02d}")
+        return os.path.join(*parts)
+
+    def write_table(self, table: pa.Table, path: str, **options) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pq.write_table(table, f"{path}.tmp", compression=self.compression, **options)
+        os.replace(f"{path}.tmp", path)
+
+    def write_events(self, table: pa.Table, column: str = "received_at") -> List[str]:
+        # Splits a micro-batch by the hour of column and writes one raw part file per hour.
+        hours = table[column].cast(pa.int64()).to_numpy() // HOUR_MS
+        paths = []
+        for hour in np.unique(hours):
+            moment = datetime.fromtimestamp(int(hour) * 3600, tz=timezone.utc)
+            name = f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+            path = os.path.join(self.partition_dir(RAW_PREFIX, moment.strftime("%Y-%m-%d"), moment.hour), name)
+            self.write_table(table.filter(pa.array(hours == hour)), path)
+            paths.append(path)
+        return paths
+
+    def files(self, prefix: str, date: str, hour: Optional[int] = None) -> List[str]:
+        directory = self.partition_dir(prefix, date, hour)
+        if not os.path.isdir(directory):
+            return []
+        paths = []
+        for current, _, names in os.walk(directory):
+            paths.extend(os.path.join(current, name) for name in names if name.endswith(".parquet"))
+        return sorted(paths)
+
+    def partitions(self, prefix: str) -> List[Tuple[str, int]]:
+        # (date, hour) pairs that hold at least one file under prefix.
+        found = []
+        base = os.path.join(self.root, prefix)
+        if not os.path.isdir(base):
+            return found
+        for date_dir in sorted(os.listdir(base)):
+            for hour_dir in sorted(os.listdir(os.path.join(base, date_dir))):
+                if self.files(prefix, date_dir.partition("=")[2], int(hour_dir.partition("=")[2])):
+                    found.append((date_dir.partition("=")[2], int(hour_dir.partition("=")[2])))
+        return found
+
+    def read(self, paths: List[str], columns: Optional[List[str]] = None) -> Optional[pa.Table]:
+        tables = [pq.read_table(path, columns=columns, memory_map=True) for path in paths]
+        return pa.concat_tables(tables) if tables else None
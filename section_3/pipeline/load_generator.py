@@ -0,0 +1,169 @@
+"""
+Load generator for the event intake. Sends synthetic comparison-chart events (page views and clicks) over
+keep-alive connections at a target rate and reports sustained events/sec, request latency and the intake's
+end-to-end latency (client send to file written in the lake).
+
+    python -m section_3.pipeline.load_generator --rate 20000 --duration 30 --output load_results.json
+
+Without --port, an intake process is started on a free port with a temporary lake (or --lake).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import List, Optional
+
+import numpy as np
+
+from section_3.pipeline.http_io import read_response, request
+
+CHARTS = [f"chart-{index}" for index in range(200)]
+CLICK_SHARE = 0.2
+
+
+def make_events(count: int, rng: random.Random, users: int) -> List[dict]:
+    now = int(time.time() * 1000)
+    events = []
+    for _ in range(count):
+        chart_id = rng.choice(CHARTS)
+        click = rng.random() < CLICK_SHARE
+        events.append({
+            "event_id": uuid.uuid4().hex,
+            "event_type": "click" if click else "page_view",
+            "user_id": f"user-{rng.randrange(users)}",
+            "chart_id": chart_id,
+            "item_id": f"item-{rng.randrange(20)}" if click else None,
+            "page_url": f"https://example.com/compare/{chart_id}",
+            "event_time": now,
+            "sent_at": now,
+        })
+    return events
+
+
+async def _client(host: str, port: int, deadline: float, events_per_second: float, batch_size: int,
+                  users: int, seed: int, latencies: List[float], totals: dict) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    rng = random.Random(seed)
+    next_send = time.monotonic()
+    try:
+        while time.monotonic() < deadline:
+            body = json.dumps(make_events(batch_size, rng, users)).encode()
+            started = time.monotonic()
+            writer.write(request("POST", "/events", f"{host}:{port}", body))
+            status, response = await read_response(reader)
+            latencies.append(time.monotonic() - started)
+            if status == 202:
+                totals["accepted"] += json.loads(response)["accepted"]
+            else:
+                totals["errors"] += 1
+            if events_per_second:
+                # Note: Sends are scheduled on a fixed cadence, so slow responses do not lower the offered rate.
+                next_send += batch_size / events_per_second
+                await asyncio.sleep(max(0.0, next_send - time.monotonic()))
+    finally:
+        writer.close()
+
+
+async def _get_stats(host: str, port: int) -> dict:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(request("GET", "/stats", f"{host}:{port}"))
+        _, body = await read_response(reader)
+        return json.loads(body)
+    finally:
+        writer.close()
+
+
+async def run_load(host: str, port: int, rate: float, duration: float, connections: int, batch_size: int,
+                   users: int, settle_seconds: float) -> dict:
+    latencies: List[float] = []
+    totals = {"accepted": 0, "errors": 0}
+    started = time.monotonic()
+    deadline = started + duration
+    await asyncio.gather(*[
+        _client(host, port, deadline, rate / connections if rate else 0.0, batch_size, users, seed,
+                latencies, totals)
+        for seed in range(connections)
+    ])
+    elapsed = time.monotonic() - started
+    # Note: Waits for the intake's last time-based flush so end-to-end latency covers the whole run.
+    await asyncio.sleep(settle_seconds)
+    stats = await _get_stats(host, port)
+    milliseconds = np.array(latencies) * 1000
+    return {
+        "offered_events_per_second": rate or None,
+        "duration_seconds": elapsed,
+        "events_accepted": totals["accepted"],
+        "events_per_second": totals["accepted"] / elapsed,
+        "request_errors": totals["errors"],
+        "request_latency_ms": {"p50": float(np.percentile(milliseconds, 50)),
+                               "p99": float(np.percentile(milliseconds, 99))} if len(latencies) else {},
+        "end_to_end_latency_ms": stats["latency"],
+        "intake": {key: stats[key] for key in ("accepted", "rejected", "written", "batches", "files", "bytes")},
+        "bytes_per_event": stats["bytes"] / stats["written"] if stats["written"] else None,
+        "window": stats["window"],
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_intake(lake_dir: str, port: int) -> subprocess.Popen:
+    process = subprocess.Popen([sys.executable, "-m", "section_3.pipeline.intake", "--port", str(port),
+                                "--lake", lake_dir])
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Event intake did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="Port of a running intake; omit to start one.")
+    parser.add_argument("--lake", help="Lake directory for the started intake (default: a temporary one).")
+    parser.add_argument("--rate", type=float, default=10_000, help="Offered events/sec in total; 0 = as fast as possible.")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=100, help="Events per POST.")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--output", help="Also write the results as JSON to this path.")
+    args = parser.parse_args()
+
+    process: Optional[subprocess.Popen] = None
+    with tempfile.TemporaryDirectory() as directory:
+        port = args.port
+        if port is None:
+            port = _free_port()
+            process = _start_intake(args.lake or directory, port)
+        settle_seconds = float(os.getenv("EVENT_BATCH_MAX_SECONDS", "1.0")) + 0.5
+        try:
+            result = asyncio.run(run_load(args.host, port, args.rate, args.duration, args.connections,
+                                          args.batch_size, args.users, settle_seconds))
+        finally:
+            if process is not None:
+                process.send_signal(signal.SIGTERM)
+                process.wait(timeout=30)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(result, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()